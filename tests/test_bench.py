@@ -0,0 +1,56 @@
+import os
+from contextlib import redirect_stdout
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from tests.base_test_case import BaseTestCase
+from zeraora.bench import *
+
+
+class BenchTest(BaseTestCase):
+
+    def test_run(self):
+        cleaned = []
+
+        def sleepy():
+            yield lambda: sum(range(100))
+            cleaned.append(True)
+
+        results = run(
+            ['sum'],
+            repeat=2,
+            min_time=0.001,
+            benchmarks={'sum': sleepy, 'len': lambda: (lambda: len('meow'))},
+        )
+        self.assertListEqual(['sum'], [result.name for result in results])
+        self.assertListEqual([True], cleaned)
+        self.assertGreater(results[0].number, 1)
+        self.assertGreater(results[0].ops, 0)
+
+    def test_compare(self):
+        results = [Result('a', 10, 1.2e-6), Result('b', 10, 1.0e-6), Result('c', 10, 1.0e-6)]
+        comparisons = compare(results, {'a': 1e-6, 'b': 1e-6}, threshold=0.1)
+        self.assertListEqual([True, False, False], [regressed for _, _, regressed in comparisons])
+        self.assertAlmostEqual(0.2, comparisons[0][1])
+        self.assertIsNone(comparisons[2][1])
+
+        with TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'baseline.json')
+            dump(results, path)
+            self.assertDictEqual({'a': 1.2e-6, 'b': 1.0e-6, 'c': 1.0e-6}, load(path))
+
+    def test_main(self):
+        self.assertIn('string.randb62', BENCHMARKS)
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(0, main(['--list']))
+        self.assertListEqual(sorted(BENCHMARKS), output.getvalue().split())
+
+        with TemporaryDirectory() as folder, redirect_stdout(StringIO()):
+            path = os.path.join(folder, 'baseline.json')
+            self.assertEqual(0, main(['-k', 'string.randb64', '--repeat', '1', '--min-time', '0.001', '--save', path]))
+            self.assertListEqual(['string.randb64'], list(load(path)))
+            self.assertEqual(1, main([
+                '-k', 'string.randb64', '--repeat', '1', '--min-time', '0.001',
+                '--compare', path, '--threshold', '-1',
+            ]))
@@ -1,6 +1,12 @@
 import unittest
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
 
-from zeraora.binary import randbytes
+from zeraora.binary import (
+    decode_timeseries, decode_varints, dump_timeseries, encode_timeseries, encode_varints, load_timeseries,
+    randbytes, unzigzag, zigzag,
+)
+from zeraora.datetime import Datetime, Timedelta, TimeFrame
 
 
 class BinaryTest(unittest.TestCase):
@@ -9,3 +15,61 @@ class BinaryTest(unittest.TestCase):
         for i in range(100):
             bytestream = randbytes(i)
             self.assertEqual(i, len(bytestream))
+
+    def test_varints(self):
+        numbers = [0, 1, 127, 128, 300, 2 ** 63, 2 ** 70 + 5]
+        self.assertEqual(b'\x00\x01\x7f\x80\x01\xac\x02', bytes(encode_varints(numbers[:5])))
+        data = encode_varints(numbers)
+        self.assertEqual(numbers, list(decode_varints([data])))
+        # 一个整数跨越两块
+        self.assertEqual(numbers, list(decode_varints(data[i:i + 1] for i in range(len(data)))))
+        with self.assertRaises(ValueError):
+            list(decode_varints([data[:-1]]))
+        for n in range(-300, 300):
+            self.assertGreaterEqual(zigzag(n), 0)
+            self.assertEqual(n, unzigzag(zigzag(n)))
+        self.assertEqual([0, 1, 2, 3, 4], [zigzag(n) for n in (0, -1, 1, -2, 2)])
+
+    def test_timeseries(self):
+        moments = [Datetime(2024, 9, 20, 0, m, s) for m in range(10) for s in range(0, 60, 5)]
+        data = encode_timeseries(moments, TimeFrame.SECOND)
+        self.assertEqual(130, len(data))
+        self.assertEqual(moments, list(decode_timeseries(data)))
+        self.assertEqual(moments, list(decode_timeseries(memoryview(bytearray(data)))))
+        self.assertIsInstance(next(decode_timeseries(data)), Datetime)
+
+        # 乱序、截断精度、带时区
+        moments = [datetime(2024, 9, 20, 8, 30, 15, 999, tzinfo=timezone(timedelta(hours=8))), datetime(2024, 9, 19, 23, 59, tzinfo=timezone.utc)]
+        self.assertEqual(
+            [Datetime(2024, 9, 20, 0, 30, tzinfo=timezone.utc), Datetime(2024, 9, 19, 23, 59, tzinfo=timezone.utc)],
+            list(decode_timeseries(encode_timeseries(moments, TimeFrame.MINUTE))),
+        )
+        # 时间差
+        deltas = [timedelta(seconds=-5), timedelta(days=3, microseconds=1), timedelta()]
+        self.assertEqual(deltas, list(decode_timeseries(encode_timeseries(deltas))))
+        self.assertIsInstance(next(decode_timeseries(encode_timeseries(deltas))), Timedelta)
+        self.assertEqual([], list(decode_timeseries(encode_timeseries([]))))
+
+        # 流式
+        fp = BytesIO()
+        moments = [Datetime(2024, 1, 1) + timedelta(microseconds=i * 12345) for i in range(10000)]
+        size = dump_timeseries(iter(moments), fp)
+        self.assertEqual(fp.tell(), size)
+        self.assertEqual(encode_timeseries(moments), fp.getvalue())
+        fp.seek(0)
+        self.assertEqual(moments, list(load_timeseries(fp, chunk_size=7)))
+
+        with self.assertRaises(ValueError):
+            encode_timeseries(moments, TimeFrame.MONTH)
+        with self.assertRaises(ValueError):
+            encode_timeseries([Datetime(2024, 1, 1), Datetime(2024, 1, 1, tzinfo=timezone.utc)])
+        with self.assertRaises(ValueError):
+            encode_timeseries([Datetime(2024, 1, 1), timedelta(days=1)])
+        with self.assertRaises(ValueError):
+            encode_timeseries([timedelta(days=1), Datetime(2024, 1, 1)])
+        with self.assertRaises(TypeError):
+            encode_timeseries([1, 2])
+        with self.assertRaises(TypeError):
+            encode_timeseries([timedelta(days=1), 2])
+        with self.assertRaises(ValueError):
+            list(decode_timeseries(b'not a series'))
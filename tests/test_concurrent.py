@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from tests.base_test_case import BaseTestCase
+from zeraora.concurrent import *
+from zeraora.datetime import BearTimer, DateRange, DatetimeRange, TimeFrame, daterange
+
+
+def count_days(days) -> int:
+    return len(days)
+
+
+class Flaky:
+    """
+    前几次调用失败，之后成功。
+    """
+
+    def __init__(self, failures: int):
+        self.failures = failures
+
+    def __call__(self, days) -> int:
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('flaky')
+        return len(days)
+
+
+class ConcurrentTest(BaseTestCase):
+
+    def test_partition(self):
+        days = daterange(date(2024, 9, 1), date(2024, 9, 8))
+        chunks = list(partition(days, 3))
+        self.assertMemberTypeIs(DateRange, chunks)
+        self.assertEqual([3, 3, 1], [len(chunk) for chunk in chunks])
+        self.assertEqual(list(days), [day for chunk in chunks for day in chunk])
+        self.assertEqual([[0, 1], [2, 3], [4]], list(partition(iter(range(5)), 2)))
+        self.assertEmpty(list(partition([], 2)))
+        with self.assertRaises(ValueError):
+            list(partition(days, 0))
+
+    def test_Backfill(self):
+        days = daterange(date(2020, 1, 1), date(2025, 1, 1))
+        results = list(Backfill(count_days, chunk=30, workers=2, inflight=3, label='test_Backfill').run(days))
+        self.assertEqual(list(range(61)), [result.index for result in results])
+        self.assertEqual(len(days), sum(result.value for result in results))
+        self.assertTrue(all(result.ok and result.attempts == 1 for result in results))
+        self.assertEqual(61, BearTimer.REGISTRY['test_Backfill'].count)
+
+        # 乱序返回
+        results = list(Backfill(count_days, chunk=7, executor='thread', ordered=False).run(days))
+        self.assertEqual(list(range(261)), sorted(result.index for result in results))
+
+        # 重试
+        with ThreadPoolExecutor(1) as executor:
+            results = list(Backfill(Flaky(2), chunk=100, executor=executor, retries=2).run(days))
+            self.assertEqual([3] + [1] * 18, [result.attempts for result in results])
+            self.assertEqual(len(days), sum(result.value for result in results))
+            # 重试后仍然失败
+            results = list(Backfill(Flaky(1), chunk=1000, executor=executor, return_exceptions=True).run(days))
+            self.assertIsInstance(results[0].error, RuntimeError)
+            self.assertIsNone(results[0].value)
+            self.assertTrue(results[1].ok)
+            with self.assertRaises(RuntimeError):
+                list(Backfill(Flaky(1), executor=executor).run(days))
+
+        # 使用现成的执行器时按 workers 决定在途的块数
+        class Counting(ThreadPoolExecutor):
+            submitted = 0
+
+            def submit(self, *args, **kwargs):
+                self.submitted += 1
+                return super().submit(*args, **kwargs)
+
+        with Counting(1) as executor:
+            results = Backfill(count_days, chunk=30, workers=1, executor=executor).run(days)
+            next(results)
+            self.assertEqual(3, executor.submitted)
+            results.close()
+
+        with self.assertRaises(ValueError):
+            Backfill(count_days, chunk=0)
+        with self.assertRaises(ValueError):
+            Backfill(count_days, executor='fiber')
+
+    def test_backfill(self):
+        results = list(backfill(count_days, date(2024, 1, 1), date(2024, 1, 2), 1, TimeFrame.HOUR, chunk=5, executor='thread'))
+        self.assertMemberTypeIs(DatetimeRange, [result.chunk for result in results])
+        self.assertEqual(datetime(2024, 1, 1, 20), results[-1].chunk[0])
+        self.assertListEqual([datetime(2024, 1, 1, h) for h in range(0, 24, 5)], [result.chunk.start for result in results])
+        self.assertEqual(24, sum(result.value for result in results))
+        results = list(backfill(count_days, date(2024, 1, 1), date(2024, 1, 31), chunk=7, executor='thread'))
+        self.assertMemberTypeIs(DateRange, [result.chunk for result in results])
+        self.assertEqual(30, sum(result.value for result in results))
@@ -1,10 +1,44 @@
-import unittest
-from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from tempfile import TemporaryDirectory
+from threading import Barrier
+from time import sleep
+from unittest import mock
 
+import zeraora.datetime
+from tests.base_test_case import BaseTestCase
 from zeraora.datetime import *
 
 
-class DatetimeTest(unittest.TestCase):
+def numpy_backends():
+    """
+    依次在使用和不使用 NumPy 的情况下执行循环体，没有安装 NumPy 时只执行后者。
+    """
+    for backend in (zeraora.datetime.numpy, None) if zeraora.datetime.numpy is not None else (None,):
+        with mock.patch.object(zeraora.datetime, 'numpy', backend):
+            yield backend
+
+
+def downgraded(op):
+    """
+    模拟 Python 3.8 以前的行为：datetime 子类与 timedelta 相加减得到的是 datetime 。
+    """
+    def wrapper(self, other):
+        result = op(self, other)
+        if isinstance(result, datetime):
+            return datetime(*result.timetuple()[:6], result.microsecond, result.tzinfo, fold=result.fold)
+        return result
+
+    return wrapper
+
+
+class DatetimeTest(BaseTestCase):
 
     def testBearTimer(self):
         bear = BearTimer()
@@ -24,6 +58,330 @@ class DatetimeTest(unittest.TestCase):
 
             _ = calc_summary(10_0000)
 
+    def testBearTimerRecords(self):
+        ticks = iter(range(0, 10 ** 9, 1500))
+        bear = BearTimer('records', clock=lambda: next(ticks))
+        self.assertListEqual([], bear.records)
+        bear.start()
+        self.assertTupleEqual((1500, 1500), bear.lap())
+        self.assertTupleEqual((3000, 1500), bear.lap())
+        self.assertEqual(4500, bear.stop())
+        records = bear.records
+        self.assertEqual(4, len(records))
+        self.assertMemberTypeIs(tuple, records)
+        moments, deltas = zip(*records)
+        self.assertEqual((timedelta(), timedelta(microseconds=1)), deltas[:2])
+        self.assertEqual(timedelta(microseconds=4), moments[-1] - moments[0])
+        details = bear.details
+        self.assertMemberTypeIs(Lap, details)
+        self.assertListEqual(records, [(lap.time, lap.delta) for lap in details])
+        self.assertTupleEqual((None, None, None), details[-1][2:])
+
+        # 只开始、停止一次，或者只记了一次时，标记不保存在数组中，但记录仍然完整
+        for capacity in (None, 1, 2):
+            ticks = iter(range(0, 10 ** 9, 1000))
+            bear = BearTimer('records', clock=lambda: next(ticks), capacity=capacity, stats=False)
+            with bear:
+                self.assertEqual([timedelta()], [delta for _, delta in bear.records])
+            kept = [timedelta(), timedelta(microseconds=1)]
+            self.assertEqual(kept[-(capacity or 2):], [delta for _, delta in bear.records])
+            bear.start()
+            bear.lap()
+            bear.lap()
+            self.assertEqual(3000, bear.stop())
+            kept = [timedelta()] + [timedelta(microseconds=1)] * 3
+            self.assertEqual(kept[-(capacity or 4):], [delta for _, delta in bear.records])
+
+        logger = logging.getLogger('zeraora.datetime')
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            bear = BearTimer()
+            bear.start()
+            bear.lap()
+            bear.stop()
+            self.assertEqual(3, len(bear.records))
+        finally:
+            logger.setLevel(level)
+
+    def testBearTimerCapacity(self):
+        ticks = iter(range(0, 10 ** 9, 1000))
+        bear = BearTimer('ring', clock=lambda: next(ticks), capacity=3, stats=False)
+        self.assertEqual(0, bear.laps)
+        with self.assertLogs('zeraora.datetime', 'DEBUG'):
+            bear.start()
+            for _ in range(9):
+                bear.lap()
+            self.assertEqual(10, bear.laps)
+            self.assertEqual(9000, bear.elapsed)
+            records = bear.records
+            self.assertEqual(3, len(records))
+            self.assertListEqual([timedelta(microseconds=1)] * 3, [delta for _, delta in records])
+            self.assertEqual(timedelta(microseconds=2), records[-1][0] - records[0][0])
+            self.assertEqual(10000, bear.stop())
+        self.assertEqual(11, bear.laps)
+        self.assertEqual(3, len(bear.records))
+
+        bear = BearTimer(clock=lambda: next(ticks), capacity=5, stats=False)
+        with self.assertLogs('zeraora.datetime', 'DEBUG'):
+            bear.start()
+            bear.lap()
+        self.assertListEqual([timedelta(), timedelta(microseconds=1)], [delta for _, delta in bear.records])
+
+        with self.assertRaises(ValueError):
+            BearTimer(capacity=0)
+
+    def testBearTimerUsage(self):
+        cpu = iter(range(0, 10 ** 9, 3000))
+        bear = BearTimer('usage', cpu=lambda: next(cpu), memory=True, capacity=2, stats=False)
+        tracing = tracemalloc.is_tracing()
+        try:
+            with self.assertLogs('zeraora.datetime', 'DEBUG') as logs:
+                with bear:
+                    self.assertTrue(tracemalloc.is_tracing())
+                    blob = bytearray(1 << 20)
+                    bear.lap('allocated')
+                    del blob
+                    bear.lap('released')
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        self.assertIn('[cpu +0.000003000] [mem +', logs.output[1])
+        self.assertTrue(logs.output[1].endswith(': allocated'))
+
+        records = bear.details
+        self.assertEqual(2, len(records))
+        self.assertListEqual([timedelta(microseconds=3)] * 2, [lap.cpu for lap in records])
+        self.assertLess(records[0].allocated, -(1 << 19))
+        self.assertLess(records[0].peak, 1 << 19)
+        self.assertLess(abs(records[1].allocated), 1 << 19)
+
+        bear = BearTimer(cpu=True, stats=False)
+        with self.assertLogs('zeraora.datetime', 'DEBUG') as logs:
+            with bear:
+                sum(range(10 ** 5))
+        self.assertIn('[cpu +', logs.output[-1])
+        self.assertNotIn('[mem', logs.output[-1])
+        self.assertGreater(bear.details[-1].cpu, timedelta())
+        self.assertIsNone(bear.details[-1].allocated)
+
+    def testBearTimerAsync(self):
+        BearTimer.REGISTRY.reset('fetch')
+
+        @BearTimer()
+        async def fetch(delay: float):
+            await asyncio.sleep(delay)
+            return delay
+
+        with self.assertLogs('zeraora.datetime', 'DEBUG') as logs:
+            self.assertEqual(0.02, asyncio.run(fetch(0.02)))
+        self.assertEqual(2, len(logs.records))
+        self.assertGreaterEqual(BearTimer.REGISTRY['fetch'].max, 20_000_000)
+
+        bear = BearTimer('shared')
+
+        async def worker(laps: int):
+            async with bear:
+                for _ in range(laps):
+                    bear.lap()
+                    await asyncio.sleep(0)
+                return len(bear.records)
+
+        async def main():
+            return await asyncio.gather(*(worker(n) for n in range(1, 6)))
+
+        with self.assertLogs('zeraora.datetime', 'DEBUG'):
+            self.assertListEqual([2, 3, 4, 5, 6], asyncio.run(main()))
+
+    def testBearTimerThreads(self):
+        bear = BearTimer(stats=False)
+        barrier = Barrier(64)
+
+        @bear
+        def work(laps: int) -> list:
+            barrier.wait()
+            for _ in range(laps):
+                bear.lap()
+                sleep(0)
+            return [len(bear.records), bear.lap()[0] > 0]
+
+        logger = logging.getLogger('zeraora.datetime')
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            with ThreadPoolExecutor(64) as executor:
+                results = list(executor.map(work, range(64)))
+        finally:
+            logger.setLevel(level)
+        self.assertListEqual([[n + 1, True] for n in range(64)], results)
+
+        shared = BearTimer()
+
+        @shared
+        def ping():
+            sleep(0)
+
+        @shared
+        def pong():
+            sleep(0)
+
+        BearTimer.REGISTRY.reset('ping')
+        BearTimer.REGISTRY.reset('pong')
+        with self.assertLogs('zeraora.datetime', 'DEBUG'):
+            with ThreadPoolExecutor(8) as executor:
+                for _ in range(16):
+                    executor.submit(ping)
+                    executor.submit(pong)
+        self.assertEqual(16, BearTimer.REGISTRY['ping'].count)
+        self.assertEqual(16, BearTimer.REGISTRY['pong'].count)
+
+    def testTimerTracer(self):
+        ticks = iter(range(0, 10 ** 9, 1000))
+        clock = lambda: next(ticks)  # noqa: E731
+        tracer = BearTimer.TRACER
+        tracer.clear()
+        tracer.enable()
+
+        @BearTimer(clock=clock, stats=False)
+        def handle():
+            with BearTimer('query', clock=clock, stats=False):
+                with BearTimer('fetch', clock=clock, stats=False):
+                    pass
+            with BearTimer('render', clock=clock, stats=False):
+                pass
+
+        try:
+            with self.assertLogs('zeraora.datetime', 'DEBUG'):
+                handle()
+        finally:
+            tracer.disable()
+
+        spans = tracer.spans
+        self.assertListEqual(
+            [('handle', 'query', 'fetch'), ('handle', 'query'), ('handle', 'render'), ('handle',)],
+            [span.stack for span in spans],
+        )
+        self.assertListEqual(['fetch', 'query', 'render', 'handle'], [span.name for span in spans])
+        self.assertListEqual([1000, 2000, 1000, 3000], [span.exclusive for span in spans])
+        self.assertEqual(1, len({span.thread for span in spans}))
+        self.assertDictEqual(
+            {'handle;query;fetch': 1, 'handle;query': 2, 'handle;render': 1, 'handle': 3},
+            tracer.collapsed(),
+        )
+
+        with TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'trace.json')
+            tracer.dump_chrome_trace(path)
+            with open(path, encoding='UTF-8') as f:
+                events = json.load(f)['traceEvents']
+            self.assertListEqual(['X'] * 4, [event['ph'] for event in events])
+            self.assertEqual(7.0, events[-1]['dur'])
+
+            path = os.path.join(folder, 'trace.folded')
+            tracer.dump_collapsed(path)
+            with open(path, encoding='UTF-8') as f:
+                self.assertEqual('handle;query;fetch 1\n', f.readline())
+
+        tracer.clear()
+        with BearTimer(stats=False):
+            pass
+        self.assertEmpty(tracer.spans)
+
+    def testTimerStats(self):
+        stats = TimerStats()
+        self.assertEqual(0, stats.percentile(99))
+        for ns in range(1, 1001):
+            stats.record(ns * 1000)
+        self.assertEqual(1000, stats.count)
+        self.assertEqual(500500000, stats.total)
+        self.assertEqual(1000, stats.min)
+        self.assertEqual(1000000, stats.max)
+        self.assertEqual(500500.0, stats.mean)
+        self.assertEqual(1000, stats.percentile(0))
+        self.assertEqual(1000000, stats.percentile(100))
+        for q in (50, 95, 99):
+            self.assertAlmostEqual(q * 10000, stats.percentile(q), delta=q * 10000 / 16)
+        self.assertLessEqual(len(stats._buckets), 200)
+        with self.assertRaises(ValueError):
+            stats.percentile(101)
+        stats.reset()
+        self.assertEqual(0, stats.count)
+
+    def testBearTimerSampling(self):
+        for label in ('every', 'rate', 'interval'):
+            BearTimer.REGISTRY.reset(label)
+
+        @BearTimer(sample=10)
+        def every():
+            return 0
+
+        @BearTimer(sample=0.5)
+        def rate():
+            return 1
+
+        @BearTimer(sample=timedelta(hours=1))
+        def interval():
+            return 2
+
+        with self.assertLogs('zeraora.datetime', 'DEBUG'):
+            for _ in range(1000):
+                self.assertEqual(0, every())
+                self.assertEqual(1, rate())
+                self.assertEqual(2, interval())
+
+        stats = BearTimer.REGISTRY['every']
+        self.assertEqual(100, stats.count)
+        self.assertEqual(1000, stats.calls)
+        self.assertEqual(0.1, stats.rate)
+        stats = BearTimer.REGISTRY['rate']
+        self.assertAlmostEqual(500, stats.count, delta=100)
+        self.assertEqual(2 * stats.count, stats.calls)
+        stats = BearTimer.REGISTRY['interval']
+        self.assertEqual(1, stats.count)
+        self.assertEqual(1, stats.calls)
+
+        # 多个线程同时到期时只计时一次
+        BearTimer.REGISTRY.reset('interval_threads')
+        barrier = Barrier(8)
+
+        @BearTimer('interval_threads', sample=timedelta(hours=1))
+        def interval_threads():
+            barrier.wait()
+
+        with ThreadPoolExecutor(8) as executor:
+            for _ in range(8):
+                executor.submit(interval_threads)
+        self.assertEqual(1, BearTimer.REGISTRY['interval_threads'].count)
+
+        for sample in (0, -1, 0.0, 1.5, timedelta()):
+            with self.assertRaises(ValueError):
+                BearTimer(sample=sample)
+        for sample in (True, '10'):
+            with self.assertRaises(TypeError):
+                BearTimer(sample=sample)
+
+    def testTimerRegistry(self):
+        registry = TimerRegistry()
+        registry.record('a', 10)
+        registry.record('a', 30)
+        registry.record('b', 20)
+        self.assertIn('a', registry)
+        self.assertListEqual(['a', 'b'], list(registry))
+        self.assertEqual(2, registry['a'].count)
+        snapshot = registry.snapshot(reset=True)
+        self.assertDictEqual(
+            dict(count=2, calls=2, rate=1.0, total=40, min=10, max=30, mean=20.0, p50=10, p95=30, p99=30),
+            snapshot['a'],
+        )
+        self.assertEmpty(registry)
+
+        BearTimer.REGISTRY.reset('registered')
+        for _ in range(3):
+            with BearTimer('registered'):
+                pass
+        BearTimer('registered', stats=False).start().stop()
+        self.assertEqual(3, BearTimer.REGISTRY['registered'].count)
+
     def test_is_leap(self):
         self.assertFalse(is_leap(1700), '1700 is not a leap year.')
         self.assertFalse(is_leap(1800), '1800 is not a leap year.')
@@ -109,3 +467,486 @@ class DatetimeTest(unittest.TestCase):
         self.assertIs(Datetime, type(Datetime.fromdatetime(today)))
         self.assertIs(Datetime, type(Datetime.of(today)))
         self.assertIs(datetime, type(Datetime.of(today).replace(standard=True)))
+
+    def testDateRange(self):
+        days = daterange(date(2024, 1, 1), date(2025, 1, 1))
+        self.assertIsInstance(days, DateRange)
+        self.assertEqual(366, len(days))
+        self.assertListEqual(list(days), list(days))
+        self.assertEqual(date(2024, 1, 1), days[0])
+        self.assertEqual(date(2024, 12, 31), days[-1])
+        self.assertRaises(IndexError, lambda: days[366])
+        self.assertIn(date(2024, 2, 29), days)
+        self.assertNotIn(date(2025, 1, 1), days)
+        self.assertNotIn(datetime(2024, 2, 29), days)
+        self.assertEqual(59, days.index(date(2024, 2, 29)))
+        self.assertRaises(ValueError, days.index, date(2023, 12, 31))
+        self.assertListEqual(list(reversed(days)), list(days)[::-1])
+        self.assertListEqual(list(days)[10:100:7], list(days[10:100:7]))
+        self.assertEqual(DateRange(date(2024, 1, 1), date(2025, 1, 1), 7), days[::7])
+
+        self.assertListEqual(
+            [date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 5)],
+            list(daterange(date(2024, 1, 1), date(2024, 1, 5), 2, closed=True)),
+        )
+        self.assertListEqual(
+            [date(2024, 1, 1), date(2024, 1, 3)],
+            list(daterange(date(2024, 1, 1), date(2024, 1, 4), 2, closed=True)),
+        )
+        self.assertListEqual(
+            [date(2024, 1, 5), date(2024, 1, 3), date(2024, 1, 1)],
+            list(daterange(date(2024, 1, 5), date(2024, 1, 1), -2, closed=True)),
+        )
+
+        mondays = daterange(date(2024, 1, 1), date(2025, 1, 1), 7)
+        march = daterange(date(2024, 3, 31), date(2024, 2, 29), -1)
+        self.assertListEqual(
+            [date(2024, 3, 25), date(2024, 3, 18), date(2024, 3, 11), date(2024, 3, 4)],
+            list(march & mondays),
+        )
+        self.assertListEqual(list(march[::-1] & days), list(march[::-1]))
+        self.assertEqual(0, len(mondays & daterange(date(2024, 1, 2), date(2024, 1, 7))))
+        self.assertEqual(0, len(days & daterange(date(2025, 1, 1), date(2026, 1, 1))))
+
+        # 包含端点且到达 date.min 或 date.max 时，不包含的结束日期无法表示
+        first = daterange(date(1, 1, 3), date.min, -1, closed=True)
+        self.assertListEqual([date(1, 1, 3), date(1, 1, 2), date.min], list(first))
+        self.assertIsNone(first.stop)
+        self.assertEqual('DateRange(range(3, 0, -1))', repr(first))
+        last = daterange(date(9999, 12, 30), date.max, closed=True)
+        self.assertListEqual([date(9999, 12, 30), date.max], list(last))
+        self.assertIsNone(last.stop)
+        self.assertEqual(date.max, daterange(date(9999, 12, 30), date.max).stop)
+
+    def testWeekrange(self):
+        self.assertListEqual(list(daterange(date(2011, 1, 31), date(2011, 2, 7))), list(weekrange(2011, 5)))
+        self.assertListEqual(
+            list(daterange(date(2011, 1, 30), date(2011, 2, 6))),
+            list(weekrange(2011, 5, sunday_first=True)),
+        )
+        self.assertListEqual(list(daterange(date(2010, 12, 27), date(2011, 1, 3))), list(weekrange(2011, 0)))
+        self.assertListEqual(list(daterange(date(2020, 12, 28), date(2021, 1, 4))), list(weekrange(2020, 53, iso=True)))
+        self.assertListEqual(list(daterange(date(2021, 1, 4), date(2021, 1, 11))), list(weekrange(2021, 1, iso=True)))
+        self.assertRaises(ValueError, weekrange, 2021, 53, iso=True)
+        self.assertRaises(ValueError, weekrange, 2021, 0, iso=True)
+        self.assertRaises(ValueError, weekrange, 2021, 54)
+        self.assertRaises(ValueError, Datetime.fromcalendar, 2021, 1, 7)
+
+        day = date(2000, 1, 1)
+        while day.year < 2030:
+            today = Datetime(day.year, day.month, day.day)
+            for sunday_first in (False, True):
+                calendar = today.calendar(sunday_first)
+                self.assertEqual(today, Datetime.fromcalendar(*calendar, sunday_first=sunday_first))
+                self.assertIn(day, weekrange(*calendar[:2], sunday_first=sunday_first))
+            self.assertIn(day, weekrange(*day.isocalendar()[:2], iso=True))
+            day += timedelta(days=1)
+
+    def testDatetimeArray(self):
+        datetimes = [
+            Datetime(1, 1, 1),
+            Datetime(1969, 12, 31, 23, 59, 59, 999999),
+            Datetime(1970, 1, 1),
+            Datetime(2011, 1, 30, 12, 34, 56, 789012),
+            Datetime(2024, 2, 29, 23, 0, 1, 2),
+            Datetime(9999, 12, 31, 23, 59, 59, 999999),
+        ]
+        column = DatetimeArray(datetimes)
+        self.assertEqual(len(datetimes), len(column))
+        self.assertListEqual(datetimes, list(column))
+        self.assertMemberTypeIs(Datetime, column)
+        self.assertEqual(0, column.values[2])
+        self.assertEqual(-1, column.values[1])
+        self.assertEqual(datetimes[-1], column[-1])
+        self.assertEqual(DatetimeArray(datetimes[1:3]), column[1:3])
+        self.assertEqual(column, DatetimeArray.frommicroseconds(column.values))
+        self.assertListEqual(
+            [Datetime(2024, 1, 1)],
+            list(DatetimeArray([datetime(2024, 1, 1, 8, tzinfo=timezone(timedelta(hours=8)))])),
+        )
+        # 带时区的 Datetime 的 replace() 与 datetime 的不同，曾经无法转换
+        self.assertListEqual(
+            [Datetime(2024, 1, 1), Datetime(2024, 1, 1, 13, 30)],
+            list(DatetimeArray([
+                Datetime(2024, 1, 1, 8, tzinfo=timezone(timedelta(hours=8))),
+                Datetime(2024, 1, 1, 8, tzinfo=timezone(-timedelta(hours=5, minutes=30))),
+            ])),
+        )
+
+        for backend in numpy_backends():
+            with self.subTest(numpy=backend is not None):
+                for frame in TimeFrame:
+                    self.assertListEqual([dt.empty(frame) for dt in datetimes], list(column.empty(frame)))
+                    self.assertListEqual([dt.fill(frame) for dt in datetimes], list(column.fill(frame)))
+                    self.assertMemberTypeIs(Datetime, column.empty(frame))
+                for sunday_first in (False, True):
+                    self.assertListEqual(
+                        [dt.calendar(sunday_first) for dt in datetimes],
+                        list(zip(*column.calendar(sunday_first))),
+                    )
+                self.assertTupleEqual((array('q'), array('q'), array('q')), DatetimeArray().calendar())
+                if backend is not None:
+                    self.assertEqual(column, DatetimeArray.fromnumpy(column.tonumpy()))
+                else:
+                    with self.assertRaises(ImportError):
+                        column.tonumpy()
+
+    def testBucketize(self):
+        events = [
+            (datetime(2024, 9, 17, 3, 59), 1),
+            (datetime(2024, 9, 17, 4, 0), 5),
+            (datetime(2024, 9, 17, 23, 0), -2),
+            (datetime(2024, 9, 18, 3, 0), 4),
+            (datetime(2024, 9, 20, 12, 0), 7),
+        ]
+        buckets = list(bucketize(iter(events), TimeFrame.DAY, offset=timedelta(hours=4)))
+        self.assertMemberTypeIs(Bucket, buckets)
+        self.assertListEqual(
+            [
+                Bucket(datetime(2024, 9, 16, 4), datetime(2024, 9, 17, 4), 1, 1, 1, 1),
+                Bucket(datetime(2024, 9, 17, 4), datetime(2024, 9, 18, 4), 3, 7, -2, 5),
+                Bucket(datetime(2024, 9, 20, 4), datetime(2024, 9, 21, 4), 1, 7, 7, 7),
+            ],
+            buckets,
+        )
+        self.assertAlmostEqual(7 / 3, buckets[1].mean)
+
+        buckets = list(bucketize(events, TimeFrame.MONTH))
+        self.assertEqual(1, len(buckets))
+        self.assertTupleEqual((datetime(2024, 9, 1), datetime(2024, 10, 1), 5, 15, -2, 7), buckets[0])
+        self.assertListEqual([], list(bucketize([], TimeFrame.DAY)))
+        self.assertRaises(ValueError, list, bucketize(events[::-1], TimeFrame.HOUR))
+
+    def testDatetimeParse(self):
+        cases = [
+            ('2024-09-17 11:22:33', '%Y-%m-%d %H:%M:%S'),
+            ('20240917', '%Y%m%d'),
+            ('17/09/24 1122', '%d/%m/%y %H%M'),
+            ('17/09/69 1122', '%d/%m/%y %H%M'),
+            ('2024-09-17T11:22:33.000245', '%Y-%m-%dT%H:%M:%S.%f'),
+            ('100% 2024{09}', '100%% %Y{%m}'),
+            ('2024-9-7 1:2:3', '%Y-%m-%d %H:%M:%S'),
+            ('Sep 17 2024', '%b %d %Y'),
+            ('2024-09-1７', '%Y-%m-%d'),
+        ]
+        for text, fmt in cases:
+            expected = datetime.strptime(text, fmt)
+            self.assertEqual(expected, Datetime.parse(text, fmt))
+            self.assertIs(Datetime, type(Datetime.parse(text, fmt)))
+            self.assertEqual(expected.strftime(fmt), Datetime.of(expected).format(fmt))
+        for text, fmt in [('2024-02-30', '%Y-%m-%d'), ('2024-09-17 ', '%Y-%m-%d')]:
+            self.assertRaises(ValueError, datetime.strptime, text, fmt)
+            self.assertRaises(ValueError, Datetime.parse, text, fmt)
+
+        self.assertEqual(datetime(2024, 9, 17, 11, 22, 33), Datetime.parse('2024-09-17T11:22:33'))
+        self.assertEqual('2024-09-17T11:22:33', Datetime(2024, 9, 17, 11, 22, 33).format())
+        self.assertEqual(datetime(999, 1, 2).strftime('%Y-%m-%d'), Datetime(999, 1, 2).format('%Y-%m-%d'))
+
+        texts = [text for text, _ in cases[:1]] * 3 + ['2024-9-7 1:2:3']
+        self.assertListEqual(
+            [datetime.strptime(text, '%Y-%m-%d %H:%M:%S') for text in texts],
+            list(Datetime.parse_many(texts, '%Y-%m-%d %H:%M:%S')),
+        )
+        self.assertListEqual(
+            [datetime(2024, 9, 17), datetime(2024, 9, 18)],
+            list(Datetime.parse_many(iter(['2024-09-17', '2024-09-18']))),
+        )
+
+    def testBusinessCalendar(self):
+        calendar = BusinessCalendar(
+            holidays=[date(2024, 10, d) for d in range(1, 8)] + [date(2024, 9, 15)],
+            workdays=[date(2024, 9, 29), date(2024, 10, 12), date(2024, 10, 14)],
+        )
+        self.assertTrue(calendar.is_working(date(2024, 9, 27)))
+        self.assertTrue(calendar.is_working(Datetime(2024, 9, 29, 9)))
+        self.assertFalse(calendar.is_working(date(2024, 10, 1)))
+        self.assertFalse(calendar.is_working(date(2024, 10, 5)))
+        self.assertIn(date(2024, 10, 12), calendar)
+        self.assertNotIn(date(2024, 10, 13), calendar)
+
+        self.assertEqual(12, calendar.count(date(2024, 9, 23), date(2024, 10, 14)))
+        self.assertEqual(13, calendar.count(date(2024, 9, 23), date(2024, 10, 14), closed=True))
+        self.assertEqual(-12, calendar.count(date(2024, 10, 14), date(2024, 9, 23)))
+        self.assertListEqual(
+            [date(2024, 9, 27), date(2024, 9, 29), date(2024, 9, 30), date(2024, 10, 8)],
+            list(calendar.daterange(date(2024, 9, 27), date(2024, 10, 8), closed=True)),
+        )
+
+        self.assertEqual(date(2024, 10, 8), calendar.add(date(2024, 9, 30), 1))
+        self.assertEqual(date(2024, 10, 8), calendar.add(date(2024, 10, 3), 1))
+        self.assertEqual(date(2024, 9, 30), calendar.add(date(2024, 10, 8), -1))
+        self.assertEqual(Datetime(2024, 10, 14, 18), calendar.add(Datetime(2024, 10, 11, 18), 2))
+        self.assertEqual(date(2024, 10, 3), calendar.add(date(2024, 10, 3), 0))
+        day = date(2024, 1, 1)
+        for n in range(-40, 41):
+            result = calendar.add(day, n)
+            self.assertTrue(calendar.is_working(result))
+            self.assertEqual(n, calendar.count(day, result) if n > 0 else -calendar.count(result, day))
+
+        sundays_only = BusinessCalendar(weekends=range(1, 7))
+        self.assertEqual(date(2024, 9, 29), sundays_only.add(date(2024, 9, 23), 1))
+        self.assertRaises(ValueError, BusinessCalendar, [date(2024, 10, 1)], [date(2024, 10, 1)])
+        self.assertRaises(ValueError, BusinessCalendar, weekends=range(7))
+        self.assertRaises(ValueError, BusinessCalendar, weekends=[7])
+
+        # 只有调休上班的日子
+        makeups = BusinessCalendar(workdays=[date(2024, 9, 29), date(2024, 10, 12)], weekends=range(7))
+        self.assertEqual(date(2024, 10, 12), makeups.add(date(2024, 9, 30), 1))
+        self.assertEqual(date(2024, 10, 12), makeups.add(date(2024, 9, 1), 2))
+        self.assertEqual(date(2024, 9, 29), makeups.add(date(2024, 12, 1), -2))
+        self.assertEqual(2, makeups.count(date(2024, 1, 1), date(2025, 1, 1)))
+        self.assertRaises(ValueError, makeups.add, date(2024, 9, 30), 2)
+        self.assertRaises(ValueError, makeups.add, date(2024, 10, 12), 1)
+        self.assertRaises(ValueError, makeups.add, date(2024, 10, 1), -2)
+        self.assertRaises(ValueError, makeups.add, date(2024, 9, 29), -1)
+
+    def testCron(self):
+        cron = Cron('30 4 * * MON-FRI')
+        self.assertEqual(Datetime(2024, 9, 23, 4, 30), cron.next(Datetime(2024, 9, 20, 5)))
+        self.assertEqual(Datetime(2024, 9, 20, 4, 30), cron.next(Datetime(2024, 9, 20, 4, 29, 59)))
+        self.assertEqual(Datetime(2024, 9, 23, 4, 30), cron.next(Datetime(2024, 9, 20, 4, 30)))
+        self.assertEqual(Datetime(2024, 9, 20, 4, 30), cron.previous(Datetime(2024, 9, 23, 4, 30)))
+        self.assertEqual(Datetime(2024, 9, 23, 4, 30), cron.previous(Datetime(2024, 9, 23, 4, 30, 1)))
+        self.assertListEqual(
+            [Datetime(2024, 9, 23, 4, 30), Datetime(2024, 9, 24, 4, 30), Datetime(2024, 9, 25, 4, 30)],
+            list(cron.upcoming(datetime(2024, 9, 21), 3)),
+        )
+
+        self.assertEqual(Datetime(2028, 2, 29), Cron('0 0 29 2 *').next(datetime(2024, 3, 1)))
+        self.assertEqual(Datetime(2024, 2, 29), Cron('0 0 29 2 *').previous(datetime(2028, 2, 28)))
+        self.assertEqual(Datetime(2025, 1, 1), Cron('@yearly').next(datetime(2024, 1, 1)))
+        self.assertEqual(Datetime(2024, 10, 31), Cron('0 0 31 * *').next(datetime(2024, 9, 1)))
+        # 日和星期都有限制时，满足其一即可
+        self.assertEqual(Datetime(2024, 9, 13), Cron('0 0 13 * FRI').next(datetime(2024, 9, 7)))
+        self.assertEqual(Datetime(2024, 9, 6), Cron('0 0 13 * FRI').next(datetime(2024, 9, 1)))
+        self.assertEqual(Datetime(2024, 9, 8, 0, 0), Cron('0 0 * * 7').next(datetime(2024, 9, 6)))
+        self.assertTupleEqual((0, 15, 30, 45), Cron('*/15 * * * *').minutes)
+        self.assertTupleEqual((1, 11, 21, 31), Cron('* * 1/10 * *').days)
+
+        moment = datetime(2024, 9, 20, 23, 58, tzinfo=timezone(timedelta(hours=8)))
+        self.assertEqual(moment + timedelta(minutes=2), Cron('@daily').next(moment))
+        for expression in ('* * * *', '60 * * * *', '* * 0 * *', '* * * 13 *', '* * * FOO *', '*/0 * * * *', '0 0 30 2 *'):
+            self.assertRaises(ValueError, Cron, expression)
+
+        # 超出 datetime 的范围时给出明确的错误，upcoming() 则提前结束
+        self.assertRaisesRegex(ValueError, '不再触发', Cron('* * * * *').next, datetime(9999, 12, 31, 23, 59))
+        self.assertRaisesRegex(ValueError, '不再触发', Cron('0 0 29 2 *').next, datetime(9997, 3, 1))
+        self.assertRaisesRegex(ValueError, '从未触发', Cron('* * * * *').previous, datetime(1, 1, 1))
+        self.assertListEqual(
+            [Datetime(9999, 12, 31, 23, 58), Datetime(9999, 12, 31, 23, 59)],
+            list(Cron('* * * * *').upcoming(datetime(9999, 12, 31, 23, 57), 5)),
+        )
+
+    def testEvery(self):
+        every = Every(15, TimeFrame.MINUTE)
+        self.assertEqual(Datetime(2024, 9, 20, 5, 15), every.next(Datetime(2024, 9, 20, 5, 7)))
+        self.assertEqual(Datetime(2024, 9, 20, 5, 30), every.next(Datetime(2024, 9, 20, 5, 15)))
+        self.assertEqual(Datetime(2024, 9, 20, 5, 0), every.previous(Datetime(2024, 9, 20, 5, 15)))
+
+        monthly = Every(1, TimeFrame.MONTH, anchor=Datetime(2024, 1, 31, 9))
+        self.assertListEqual(
+            [Datetime(2024, 2, 29, 9), Datetime(2024, 3, 31, 9), Datetime(2024, 4, 30, 9)],
+            list(monthly.upcoming(datetime(2024, 2, 1), 3)),
+        )
+        self.assertEqual(Datetime(2024, 1, 31, 9), monthly.previous(datetime(2024, 2, 29, 9)))
+        self.assertEqual(Datetime(2022, 2, 28), Every(2, TimeFrame.YEAR, Datetime(2020, 2, 29)).next(datetime(2020, 3, 1)))
+        self.assertRaises(ValueError, Every, 0)
+
+        for every in (Every(1, TimeFrame.HOUR), Every(1, TimeFrame.MONTH)):
+            self.assertRaisesRegex(ValueError, '不再触发', every.next, datetime(9999, 12, 31, 23))
+            self.assertRaisesRegex(ValueError, '从未触发', every.previous, datetime(1, 1, 1))
+            self.assertListEqual([], list(every.upcoming(datetime(9999, 12, 31, 23), 2)))
+
+        class Incomplete(Schedule):
+            def next(self, after: datetime) -> Datetime:
+                return Datetime.of(after)
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def testZoneConverter(self):
+        try:
+            from zoneinfo import ZoneInfo
+            zone = ZoneInfo('America/New_York')
+        except Exception:
+            self.skipTest('没有可用的时区数据。')
+
+        converter = ZoneConverter.of(zone, 2000, 2030)
+        self.assertIs(converter, ZoneConverter.of(zone, 2000, 2030))
+        moments = [
+            datetime(2024, 3, 10, 6, 59, 59),
+            datetime(2024, 3, 10, 7),
+            datetime(2024, 11, 3, 5, 30),
+            datetime(2024, 11, 3, 6),
+            datetime(2024, 11, 3, 6, 59, 59),
+            datetime(2024, 11, 3, 7),
+            datetime(1999, 7, 1),
+            datetime(2030, 7, 1),
+        ]
+        for moment, local in zip(moments, converter.convert_many(moments)):
+            expected = moment.replace(tzinfo=timezone.utc).astimezone(zone)
+            self.assertEqual(expected, local)
+            self.assertEqual(expected.replace(tzinfo=None), local.replace(tzinfo=None))
+            self.assertEqual(expected.fold, local.fold)
+            self.assertIs(zone, local.tzinfo)
+        self.assertEqual(1, converter.convert(Datetime(2024, 11, 3, 6, 30)).fold)
+        self.assertIs(Datetime, type(converter.convert(Datetime(2024, 11, 3, 6, 30))))
+        self.assertEqual(
+            datetime(2024, 7, 1, 8),
+            converter.convert(datetime(2024, 7, 1, 20, tzinfo=timezone(timedelta(hours=8)))).replace(tzinfo=None),
+        )
+        for backend in numpy_backends():
+            with self.subTest(numpy=backend is not None):
+                self.assertListEqual(
+                    [converter.convert(moment).replace(tzinfo=None) for moment in moments],
+                    list(converter.localize(DatetimeArray(moments))),
+                )
+
+    def testDatetimeRange(self):
+        quarters = datetimerange(Datetime(2024, 3, 31), Datetime(2025, 1, 1), 3, TimeFrame.MONTH)
+        self.assertIsInstance(quarters, DatetimeRange)
+        self.assertListEqual(
+            [Datetime(2024, 3, 31), Datetime(2024, 6, 30), Datetime(2024, 9, 30), Datetime(2024, 12, 31)],
+            list(quarters),
+        )
+        self.assertEqual(4, len(quarters))
+        self.assertEqual(Datetime(2024, 9, 30), quarters[2])
+        self.assertEqual(Datetime(2024, 12, 31), quarters[-1])
+        self.assertIn(Datetime(2024, 6, 30), quarters)
+        self.assertNotIn(Datetime(2024, 6, 29), quarters)
+        self.assertNotIn(Datetime(2025, 3, 31), quarters)
+        self.assertEqual(2, quarters.index(Datetime(2024, 9, 30)))
+        self.assertListEqual(list(quarters)[::-1], list(reversed(quarters)))
+        self.assertListEqual(list(quarters)[1::2], list(quarters[1::2]))
+        self.assertEqual(6, quarters[1::2].step)
+        self.assertEqual(quarters, eval(repr(quarters), globals()))
+        self.assertEqual(Datetime(2024, 3, 31), quarters.start)
+        self.assertEqual(Datetime(2024, 6, 30), quarters[1:].start)
+        self.assertEqual(Datetime(2024, 12, 31), quarters[::-1].start)
+
+        # 切片后的月末
+        months = datetimerange(Datetime(2024, 1, 31), Datetime(2024, 6, 1), frame=TimeFrame.MONTH)
+        self.assertListEqual(
+            [Datetime(2024, 2, 29), Datetime(2024, 3, 31), Datetime(2024, 4, 30), Datetime(2024, 5, 31)],
+            list(months[1:]),
+        )
+        for index in (slice(1, None), slice(1, 3), slice(None, None, -1), slice(3, 0, -2), slice(None, None, 2)):
+            self.assertEqual(months[index], eval(repr(months[index]), globals()))
+            self.assertEqual(list(months)[index][0], months[index].start)
+
+        hours = datetimerange(Datetime(2024, 1, 1), Datetime(2024, 1, 2), frame=TimeFrame.HOUR)
+        self.assertListEqual(
+            [Datetime(2024, 1, 1), Datetime(2024, 1, 1, 8), Datetime(2024, 1, 1, 16)],
+            [hours[i:i + 8].start for i in range(0, 24, 8)],
+        )
+        self.assertEqual(hours[3:], eval(repr(hours[3:]), globals()))
+
+        hours = datetimerange(Datetime(2024, 9, 20, 23), Datetime(2024, 9, 21, 2), frame=TimeFrame.HOUR, closed=True)
+        self.assertEqual(4, len(hours))
+        self.assertEqual(Datetime(2024, 9, 21, 2), hours[-1])
+        self.assertEqual(0, len(datetimerange(Datetime(2024, 1, 2), Datetime(2024, 1, 1))))
+        self.assertListEqual(
+            [Datetime(2024, 2, 29), Datetime(2023, 2, 28)],
+            list(datetimerange(Datetime(2024, 2, 29), Datetime(2022, 2, 28), -1, TimeFrame.YEAR)),
+        )
+        self.assertRaises(ValueError, DatetimeRange, Datetime(2024, 1, 1), Datetime(2024, 2, 1), 0)
+
+        self.assertListEqual(
+            [
+                (Datetime(2024, 1, 1), Datetime(2024, 1, 31, 23, 59, 59, 999999)),
+                (Datetime(2024, 2, 1), Datetime(2024, 2, 29, 23, 59, 59, 999999)),
+            ],
+            list(datetimerange(Datetime(2024, 1, 1), Datetime(2024, 3, 1), frame=TimeFrame.MONTH).buckets()),
+        )
+        for start, end in datetimerange(Datetime(2024, 1, 1), Datetime(2025, 1, 1), frame=TimeFrame.MONTH).buckets():
+            self.assertEqual(start.empty(TimeFrame.MONTH), start)
+            self.assertEqual(start.fill(TimeFrame.MONTH), end)
+
+    def testIntervalSet(self):
+        def at(hour: int, minute: int = 0) -> Datetime:
+            return Datetime(2024, 9, 20, hour, minute)
+
+        busy = IntervalSet([(at(9), at(10)), (at(14), at(15)), (at(9, 30), at(11)), (at(12), at(12))])
+        self.assertListEqual([(at(9), at(11)), (at(14), at(15))], list(busy))
+        busy.add(at(11), at(12))
+        busy.add(at(13), at(13, 30))
+        self.assertListEqual([(at(9), at(12)), (at(13), at(13, 30)), (at(14), at(15))], list(busy))
+        self.assertEqual(Timedelta(hours=4, minutes=30), busy.duration)
+        self.assertIsInstance(busy.duration, Timedelta)
+        self.assertRaises(ValueError, busy.add, at(10), at(9))
+
+        self.assertEqual((at(9), at(12)), busy.covering(at(11, 59)))
+        self.assertIsNone(busy.covering(at(12)))
+        self.assertIn(at(14), busy)
+        self.assertNotIn(at(15), busy)
+        self.assertListEqual(
+            [(at(13), at(13, 30)), (at(14), at(15))],
+            list(busy.overlapping(at(12), at(14, 30))),
+        )
+        self.assertListEqual(
+            [(at(8), at(9)), (at(12), at(13)), (at(13, 30), at(14)), (at(15), at(18))],
+            list(busy.gaps(at(8), at(18))),
+        )
+        self.assertListEqual(
+            [(at(12), at(13)), (at(15), at(18))],
+            list(busy.gaps(at(8, 30), at(18), Timedelta(hours=1))),
+        )
+
+        lunch = IntervalSet([(at(11, 30), at(13, 15))])
+        self.assertListEqual(
+            [(at(9), at(13, 30)), (at(14), at(15))],
+            list(busy | lunch),
+        )
+        self.assertListEqual([(at(11, 30), at(12)), (at(13), at(13, 15))], list(busy & lunch))
+        self.assertListEqual(
+            [(at(9), at(11, 30)), (at(13, 15), at(13, 30)), (at(14), at(15))],
+            list(busy - lunch),
+        )
+        busy.remove(at(11, 30), at(13, 15))
+        self.assertEqual(busy - lunch, busy)
+        busy.remove(at(8), at(20))
+        self.assertFalse(busy)
+
+    def testCoarseClock(self):
+        clock = CoarseClock(timedelta(hours=1))
+        now = clock.now()
+        self.assertIsInstance(now, Datetime)
+        self.assertIs(now, clock.now())
+        self.assertLess(abs(datetime.now() - now), timedelta(seconds=5))
+        start, end = clock.bounds(TimeFrame.DAY)
+        self.assertEqual(now.empty(TimeFrame.DAY), start)
+        self.assertEqual(now.fill(TimeFrame.DAY), end)
+        self.assertIs(start, clock.bounds(TimeFrame.DAY)[0])
+
+        clock = CoarseClock(timedelta(microseconds=1), tz=timezone.utc)
+        first = clock.now()
+        sleep(0.002)
+        self.assertGreater(clock.now(), first)
+        self.assertIs(timezone.utc, first.tzinfo)
+
+        with ThreadPoolExecutor(4) as executor:
+            moments = list(executor.map(lambda _: clock.now(), range(1000)))
+        self.assertMemberTypeIs(Datetime, moments)
+
+    def testPython37Arithmetic(self):
+        zone = timezone(timedelta(hours=8))
+        with mock.patch.object(Datetime, '__add__', downgraded(datetime.__add__)), \
+                mock.patch.object(Datetime, '__radd__', downgraded(datetime.__radd__)), \
+                mock.patch.object(Datetime, '__sub__', downgraded(datetime.__sub__)):
+            self.assertIs(datetime, type(Datetime(2024, 1, 1) + timedelta(hours=1)))
+
+            hours = datetimerange(Datetime(2024, 1, 1), Datetime(2024, 1, 2), 6, TimeFrame.HOUR)
+            self.assertMemberTypeIs(Datetime, hours)
+            self.assertIsInstance(hours[-1], Datetime)
+            self.assertIsInstance(hours[1:].start, Datetime)
+            self.assertMemberTypeIs(Datetime, [moment for bucket in hours.buckets() for moment in bucket])
+
+            buckets = list(bucketize([(datetime(2024, 9, 17, 5), 1)], TimeFrame.DAY, offset=timedelta(hours=4)))
+            self.assertMemberTypeIs(Datetime, [buckets[0].start, buckets[0].stop])
+
+            self.assertMemberTypeIs(Datetime, DatetimeArray([Datetime(2024, 1, 1), Datetime(2024, 1, 2)]))
+
+            converter = ZoneConverter(zone, 2000, 2030)
+            self.assertIsInstance(converter.convert(Datetime(2024, 7, 1)), Datetime)
+            self.assertIsInstance(converter.convert(Datetime(1999, 7, 1)), Datetime)
+            self.assertIs(datetime, type(converter.convert(datetime(1999, 7, 1))))
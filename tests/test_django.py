@@ -0,0 +1,118 @@
+import asyncio
+import importlib.util
+import re
+import sys
+from unittest import mock
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        ROOT_URLCONF=__name__,
+        USE_TZ=True,
+    )
+    django.setup()
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import path, resolve
+
+from tests.base_test_case import BaseTestCase
+import zeraora.django
+from zeraora.datetime import TimerRegistry
+from zeraora.django import TimingMiddleware
+
+
+def order(request, pk):
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('orders/<int:pk>/', order, name='order'),
+]
+
+
+class Middleware(TimingMiddleware):
+    registry = TimerRegistry()
+
+
+class DjangoTest(BaseTestCase):
+
+    def request(self, url: str = '/orders/1/'):
+        request = RequestFactory().get(url)
+        request.resolver_match = resolve(url)
+        return request
+
+    def test_TimingMiddleware(self):
+        def get_response(request):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.execute('SELECT 2')
+            response = HttpResponse()
+            response['Server-Timing'] = 'app;dur=1'
+            return response
+
+        middleware = Middleware(get_response)
+        self.assertFalse(iscoroutinefunction(middleware))
+
+        # 默认只在 DEBUG 时才暴露数据库耗时
+        response = middleware(self.request())
+        self.assertRegex(response['Server-Timing'], r'^app;dur=1, total;dur=\d+\.\d{3}$')
+        with override_settings(DEBUG=True):
+            response = middleware(self.request())
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^app;dur=1, total;dur=\d+\.\d{3}, db;dur=\d+\.\d{3};desc="2 queries"$',
+        )
+        total, db = map(float, re.findall(r'dur=(\d+\.\d+)', response['Server-Timing']))
+        self.assertLessEqual(db, total)
+
+        class Quiet(Middleware):
+            header = ''
+            database = True
+
+        self.assertNotIn('Server-Timing', Quiet(lambda request: HttpResponse())(self.request()))
+        self.assertEqual(3, Middleware.registry['GET orders/<int:pk>/'].count)
+
+        # 没有匹配到路由的请求不参与汇总
+        request = RequestFactory().get('/missing/')
+        self.assertIn('Server-Timing', middleware(request))
+        self.assertEqual(['GET orders/<int:pk>/'], list(Middleware.registry))
+
+    def test_TimingMiddleware_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        class Async(TimingMiddleware):
+            registry = TimerRegistry()
+
+        middleware = Async(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with override_settings(DEBUG=True):
+            response = asyncio.run(middleware(self.request('/orders/2/')))
+        # 异步请求无法统计数据库耗时
+        self.assertRegex(response['Server-Timing'], r'^total;dur=\d+\.\d{3}$')
+        self.assertEqual(1, Async.registry['GET orders/<int:pk>/'].count)
+
+    def test_TimingMiddleware_without_asgiref(self):
+        # 模拟没有 asgiref 或者 asgiref 低于 3.6 的环境，重新导入一份模块
+        spec = importlib.util.spec_from_file_location('zeraora_django_legacy', zeraora.django.__file__)
+        legacy = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(sys.modules, {'asgiref.sync': None}):
+            spec.loader.exec_module(legacy)
+
+        async def get_response(request):
+            return HttpResponse()
+
+        class Async(legacy.TimingMiddleware):
+            registry = None
+
+        middleware = Async(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(self.request('/orders/3/')))
+        self.assertRegex(response['Server-Timing'], r'^total;dur=\d+\.\d{3}$')
+        self.assertFalse(asyncio.iscoroutinefunction(Async(lambda request: HttpResponse())))
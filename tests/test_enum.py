@@ -141,7 +141,7 @@ class EnumsTest(BaseTestCase):
         self.assertMemberTypeIs(str, Province.names)
         self.assertMemberTypeIs(str, Province.values)
         self.assertMemberTypeIs(str, Province.items)
-        self.assertListEqual(list(zip(Province.values, Province.labels)), Province.choices)
+        self.assertTupleEqual(tuple(zip(Province.values, Province.labels)), Province.choices)
         self.assertMemberTypeIs(int, Province.numerics)
         self.assertMemberTypeIs(str, Province.shorts)
         self.assertMemberTypeIs(str, Province.codes)
@@ -157,6 +157,22 @@ class EnumsTest(BaseTestCase):
         self.assertTrue('34' in Province)
         self.assertFalse(Region.EAST in Province)
         self.assertFalse(34 in Province)
+        self.assertFalse(['34'] in Province)
+        self.assertTrue(1 in Region)
+        self.assertTrue(0 in Region)
+
+        self.assertIs(Province.ANHUI, Province.by('value', '34'))
+        self.assertIs(Province.ANHUI, Province.by('code', 'AH'))
+        self.assertIs(Province.ANHUI, Province.by('numeric', 34))
+        self.assertIs(Province.BEIJING, Province.by('region', Region.NORTH))
+        self.assertIs(Province.BEIJING, Province.by('region', 1))
+        self.assertIs(Region.HMT, Region.by('label', '港澳台'))
+        with self.assertRaises(ValueError):
+            Province.by('code', 'XX')
+        with self.assertRaises(ValueError):
+            Province.by('code', ['AH'])
+        with self.assertRaises(KeyError):
+            Province.by('id_code', '340000')
 
         class SizeLevel(Items):
             NORMAL = 0, 'bag'
@@ -199,3 +215,105 @@ class EnumsTest(BaseTestCase):
                 NORMAL = 0, 'INFO'
                 LOW = -10, 'DEBUG'
                 __properties__ = 'generate_next_value',
+
+    def testItemsIndex(self):
+        class Shape(Items):
+            POINT = 0, [0]
+            LINE = 1, [0, 1]
+            SQUARE = [0, 1, 2, 3], 'square'
+            __properties__ = 'vertices',
+
+        self.assertIs(Shape.LINE, Shape.by('vertices', [0, 1]))
+        self.assertIs(Shape.SQUARE, Shape.by('value', [0, 1, 2, 3]))
+        self.assertIs(Shape.SQUARE, Shape.by('vertices', 'square'))
+        self.assertTrue([0, 1, 2, 3] in Shape)
+        self.assertTrue(1 in Shape)
+        self.assertFalse(2 in Shape)
+        with self.assertRaises(ValueError):
+            Shape.by('vertices', [1])
+
+    def testItemsCache(self):
+        class Answer(Items):
+            NO = 0, 'No', 'closed'
+            YES = 1, 'Yes', 'open'
+            __empty__ = '(Unknown)'
+            __properties__ = 'label', 'status'
+
+            @property
+            def label(self) -> str:
+                return self._label_
+
+        self.assertIs(Answer.values, Answer.values)
+        self.assertIs(Answer.choices, Answer.choices)
+        self.assertIs(Answer.labels, Answer.labels)
+        self.assertTupleEqual(('__empty__', 'NO', 'YES'), Answer.names)
+        self.assertTupleEqual((None, 0, 1), Answer.values)
+        self.assertDictEqual({'__empty__': None, 'NO': 0, 'YES': 1}, dict(Answer.items))
+        self.assertTupleEqual(((None, '(Unknown)'), (0, 'No'), (1, 'Yes')), Answer.choices)
+        self.assertTupleEqual(('No', 'Yes'), Answer.labels)
+        self.assertTupleEqual(('No', 'Yes'), Answer.labeles)
+        self.assertTupleEqual(('closed', 'open'), Answer.statuses)
+        self.assertIs(Answer.statuses, Answer.statuss)
+        with self.assertRaises(TypeError):
+            Answer.items['MAYBE'] = 2
+        with self.assertRaises(AttributeError):
+            _ = Answer.colors
+
+    def testItemsLazy(self):
+        calls = []
+
+        class Phase(Items):
+            BEGIN = 1, 'Begin'
+            END = 2, 'End'
+            __properties__ = 'label',
+
+            @property
+            def label(self) -> str:
+                calls.append(self._name_)
+                return self._label_
+
+        # 创建类时不调用 getter ，第一次访问时才计算，之后不再调用
+        self.assertEmpty(calls)
+        self.assertIs(Phase.END, Phase.by('value', 2))
+        self.assertEmpty(calls)
+        self.assertTupleEqual(('Begin', 'End'), Phase.labels)
+        self.assertListEqual(['BEGIN', 'END'], calls)
+        self.assertTupleEqual(((1, 'Begin'), (2, 'End')), Phase.choices)
+        self.assertIs(Phase.END, Phase.by('label', 'End'))
+        self.assertListEqual(['BEGIN', 'END'], calls)
+
+    def testItemsProperty(self):
+        class Broken(Items):
+            OK = 1, 'ok'
+            BAD = 2
+            __properties__ = 'label', 'code'
+
+            @property
+            def label(self) -> str:
+                return self._label_
+
+            @property
+            def code(self) -> str:
+                raise RuntimeError('code')
+
+        # getter 中的异常原样抛出，不会变成 None
+        with self.assertRaises(AttributeError):
+            _ = Broken.labels
+        with self.assertRaises(AttributeError):
+            _ = Broken.choices
+        with self.assertRaises(AttributeError):
+            Broken.by('label', None)
+        with self.assertRaises(RuntimeError):
+            _ = Broken.codes
+        with self.assertRaises(RuntimeError):
+            Broken.by('code', 'x')
+        self.assertIs(Broken.BAD, Broken.by('value', 2))
+
+        # 只声明而没有定义 property 时，缺少的值同样不会变成 None
+        class Bare(Items):
+            OK = 1, 'ok'
+            BAD = 2
+            __properties__ = 'label',
+
+        with self.assertRaises(AttributeError):
+            _ = Bare.labels
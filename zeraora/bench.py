@@ -0,0 +1,603 @@
+"""
+性能基准测试。
+
+在命令行中运行所有基准测试： ::
+
+    python -m zeraora.bench
+
+只运行名称中包含某些文字的基准测试，并将结果保存为基线： ::
+
+    python -m zeraora.bench -k datetime -k string --save baseline.json
+
+与基线比较，耗时增加超过 10% 的基准测试会被标记为退化，且进程以 ``1`` 退出： ::
+
+    python -m zeraora.bench --compare baseline.json --threshold 0.1
+"""
+from __future__ import annotations
+
+__all__ = [
+    'Result',
+    'BENCHMARKS',
+    'benchmark',
+    'run',
+    'compare',
+    'dump',
+    'load',
+    'main',
+]
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import timeit
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from math import ceil
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from zeraora import __version__
+from zeraora.binary import decode_timeseries, encode_timeseries
+from zeraora.config import datasize, during
+from zeraora.datetime import (
+    BearTimer, BusinessCalendar, CoarseClock, Cron, Datetime, DatetimeArray, IntervalSet, TimeFrame, ZoneConverter,
+    bucketize, daterange, weekrange,
+)
+from zeraora.enum import Items
+from zeraora.math import bitstream, digitstream
+from zeraora.string import case_camel_to_snake, randb62, randb64
+
+# BearTimer 输出日志所用的 Logger
+_logger = logging.getLogger('zeraora.datetime')
+
+BENCHMARKS: dict[str, Callable] = {}
+"""所有已登记的基准测试，键为名称，值为准备函数。"""
+
+
+class Result(NamedTuple):
+    """
+    一项基准测试的结果。
+    """
+    name: str
+    """基准测试的名称。"""
+    number: int
+    """每一轮调用的次数。"""
+    best: float
+    """最快的一轮中平均每次调用的耗时（秒）。"""
+
+    @property
+    def ops(self) -> float:
+        """
+        每秒可以调用多少次。
+        """
+        return 1 / self.best if self.best else float('inf')
+
+
+def benchmark(name: str):
+    """
+    登记一项基准测试。
+
+    被装饰的函数负责准备测试数据，并返回一个无参数的、需要计时的函数；
+    如果测试结束后需要清理，可以改为 ``yield`` 这个函数，清理工作写在 ``yield`` 之后。
+
+    >>> @benchmark('string.randb62')
+    >>> def _():
+    >>>     return lambda: randb62(32)
+    """
+
+    def decorator(setup: Callable):
+        if name in BENCHMARKS:
+            raise KeyError(f'基准测试 {name} 已经登记过了。')
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def _measure(name: str, setup: Callable, repeat: int, min_time: float) -> Result:
+    prepared = setup()
+    generator = prepared if hasattr(prepared, '__next__') else None
+    func = next(generator) if generator is not None else prepared
+    try:
+        timer = timeit.Timer(func)
+        number = 1
+        while True:
+            elapsed = timer.timeit(number)
+            if elapsed >= min_time:
+                break
+            number = max(number * 2, ceil(number * min_time / elapsed)) if elapsed else number * 10
+        best = min([elapsed] + timer.repeat(repeat - 1, number)) if repeat > 1 else elapsed
+    finally:
+        if generator is not None:
+            next(generator, None)
+            generator.close()
+    return Result(name, number, best / number)
+
+
+def run(
+        patterns: Iterable[str] = (),
+        repeat: int = 5,
+        min_time: float = 0.2,
+        benchmarks: dict[str, Callable] = None,
+) -> list[Result]:
+    """
+    运行基准测试。
+
+    :param patterns: 只运行名称中包含其中任意一个字符串的基准测试。默认运行所有基准测试。
+    :param repeat: 每项基准测试重复多少轮，取最快的一轮。
+    :param min_time: 每一轮至少运行多少秒，调用次数据此自动确定。
+    :param benchmarks: 需要运行的基准测试。默认是 :data:`BENCHMARKS` 。
+    :return: 按名称排序的结果。
+    """
+    benchmarks = BENCHMARKS if benchmarks is None else benchmarks
+    patterns = tuple(patterns)
+    return [
+        _measure(name, benchmarks[name], repeat, min_time)
+        for name in sorted(benchmarks)
+        if not patterns or any(p in name for p in patterns)
+    ]
+
+
+def compare(
+        results: Iterable[Result],
+        baseline: dict[str, float],
+        threshold: float = 0.1,
+) -> list[tuple[Result, Optional[float], bool]]:
+    """
+    与基线比较。
+
+    :param results: 本次运行的结果。
+    :param baseline: 基线中每项基准测试每次调用的耗时（秒）。
+    :param threshold: 耗时增加超过多少比例时视为退化。
+    :return: 每项结果、相对基线的耗时变化比例（基线中没有时为 ``None``）、是否退化。
+    """
+    comparisons = []
+    for result in results:
+        base = baseline.get(result.name)
+        change = None if not base else result.best / base - 1
+        comparisons.append((result, change, change is not None and change > threshold))
+    return comparisons
+
+
+def dump(results: Iterable[Result], path: str):
+    """
+    将结果保存为 JSON 格式的基线。
+    """
+    data = dict(
+        zeraora=__version__,
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        results={result.name: result.best for result in results},
+    )
+    with open(path, 'w', encoding='UTF-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> dict[str, float]:
+    """
+    读取 JSON 格式的基线，返回每项基准测试每次调用的耗时（秒）。
+    """
+    with open(path, encoding='UTF-8') as f:
+        return json.load(f)['results']
+
+
+def _humanize(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m zeraora.bench', description='运行 Zeraora 的基准测试。')
+    parser.add_argument('-k', dest='patterns', action='append', default=[], metavar='TEXT',
+                        help='只运行名称中包含该文字的基准测试，可以重复指定。')
+    parser.add_argument('--repeat', type=int, default=5, help='每项基准测试重复多少轮，取最快的一轮。')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每一轮至少运行多少秒。')
+    parser.add_argument('--save', metavar='PATH', help='将结果保存为基线。')
+    parser.add_argument('--compare', metavar='PATH', help='与基线比较。')
+    parser.add_argument('--threshold', type=float, default=0.1, help='耗时增加超过多少比例时视为退化。')
+    parser.add_argument('--list', action='store_true', help='只列出所有基准测试的名称。')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in sorted(BENCHMARKS):
+            print(name)
+        return 0
+
+    baseline = load(args.compare) if args.compare else {}
+    width = max((len(name) for name in BENCHMARKS), default=0)
+    print(f'{"benchmark":<{width}}  {"ops/sec":>14}  {"per call":>12}  {"change":>8}')
+    results = []
+    regressions = 0
+    for name in sorted(BENCHMARKS):
+        if args.patterns and not any(p in name for p in args.patterns):
+            continue
+        result = _measure(name, BENCHMARKS[name], args.repeat, args.min_time)
+        (_, change, regressed), = compare([result], baseline, args.threshold)
+        results.append(result)
+        regressions += regressed
+        print(
+            f'{name:<{width}}  {result.ops:>14,.0f}  {_humanize(result.best):>12}  '
+            f'{"" if change is None else format(change, "+.1%"):>8}'
+            f'{"  REGRESSION" if regressed else ""}',
+            flush=True,
+        )
+    if args.save:
+        dump(results, args.save)
+    return 1 if regressions else 0
+
+
+# ---- 日期时间 ----
+
+@contextmanager
+def _logging(enabled: bool):
+    # 启用时把日志输出到 NullHandler ，只计入格式化之前的开销；禁用时 Logger 直接过滤掉 DEBUG 日志
+    handlers, level, propagate = _logger.handlers, _logger.level, _logger.propagate
+    if enabled:
+        _logger.handlers, _logger.propagate = [logging.NullHandler()], False
+    _logger.setLevel(logging.DEBUG if enabled else logging.INFO)
+    try:
+        yield
+    finally:
+        _logger.handlers, _logger.propagate = handlers, propagate
+        _logger.setLevel(level)
+
+
+def _bear_lap(enabled: bool):
+    with _logging(enabled), BearTimer('bench', stats=False) as bear:
+        yield bear.lap
+
+
+def _bear_decorator(enabled: bool, stats: bool):
+    @BearTimer('bench', stats=stats)
+    def noop():
+        pass
+
+    with _logging(enabled):
+        yield noop
+    BearTimer.REGISTRY.reset('noop')
+
+
+def _bear_with(enabled: bool):
+    bear = BearTimer('bench', stats=False)
+
+    def block():
+        with bear:
+            pass
+
+    with _logging(enabled):
+        yield block
+
+
+for _enabled, _suffix in ((True, ''), (False, '[disabled]')):
+    benchmark(f'datetime.BearTimer.lap{_suffix}')(partial(_bear_lap, _enabled))
+    benchmark(f'datetime.BearTimer.decorator{_suffix}')(partial(_bear_decorator, _enabled, True))
+    benchmark(f'datetime.BearTimer.decorator[nostats]{_suffix}')(partial(_bear_decorator, _enabled, False))
+    benchmark(f'datetime.BearTimer.with{_suffix}')(partial(_bear_with, _enabled))
+
+
+@benchmark('datetime.Datetime.empty')
+def _():
+    now = Datetime(2024, 9, 17, 11, 22, 33, 245678)
+    return lambda: now.empty(TimeFrame.MONTH)
+
+
+@benchmark('datetime.Datetime.fill')
+def _():
+    now = Datetime(2024, 9, 17, 11, 22, 33, 245678)
+    return lambda: now.fill(TimeFrame.MONTH)
+
+
+@benchmark('datetime.Datetime.calendar')
+def _():
+    now = Datetime(2024, 9, 17, 11, 22, 33, 245678)
+    return now.calendar
+
+
+@benchmark('datetime.Datetime.fromcalendar')
+def _():
+    return lambda: Datetime.fromcalendar(2024, 37, 2)
+
+
+def _column(size: int = 10_000) -> DatetimeArray:
+    # 一年内均匀分布的时间戳
+    return DatetimeArray.frommicroseconds(range(1704067200_000000, 1735689600_000000, 31622400_000000 // size))
+
+
+@benchmark('datetime.DatetimeArray.empty')
+def _():
+    column = _column()
+    return lambda: column.empty(TimeFrame.MONTH)
+
+
+@benchmark('datetime.DatetimeArray.fill')
+def _():
+    column = _column()
+    return lambda: column.fill(TimeFrame.HOUR)
+
+
+@benchmark('datetime.DatetimeArray.calendar')
+def _():
+    column = _column()
+    return column.calendar
+
+
+@benchmark('datetime.bucketize')
+def _():
+    events = [(dt, i) for i, dt in enumerate(_column())]
+    return lambda: list(bucketize(events, TimeFrame.DAY))
+
+
+@benchmark('datetime.Datetime.parse')
+def _():
+    return lambda: Datetime.parse('2024-09-17 11:22:33', '%Y-%m-%d %H:%M:%S')
+
+
+@benchmark('datetime.Datetime.parse[strptime]')
+def _():
+    return lambda: Datetime.strptime('2024-09-17 11:22:33', '%Y-%m-%d %H:%M:%S')
+
+
+@benchmark('datetime.Datetime.parse[iso]')
+def _():
+    return lambda: Datetime.parse('2024-09-17 11:22:33')
+
+
+@benchmark('datetime.Datetime.parse_many')
+def _():
+    texts = [f'2024-09-{d:02d} {h:02d}:22:33' for d in range(1, 31) for h in range(24)]
+    return lambda: list(Datetime.parse_many(texts, '%Y-%m-%d %H:%M:%S'))
+
+
+@benchmark('datetime.Datetime.format')
+def _():
+    now = Datetime(2024, 9, 17, 11, 22, 33, 245678)
+    return lambda: now.format('%Y-%m-%d %H:%M:%S.%f')
+
+
+@benchmark('datetime.Datetime.format[strftime]')
+def _():
+    now = Datetime(2024, 9, 17, 11, 22, 33, 245678)
+    return lambda: now.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _business_calendar() -> BusinessCalendar:
+    # 十年的节假日，每年约二十天
+    holidays = [date(year, month, day) for year in range(2020, 2030) for month in (1, 5, 10) for day in range(1, 8)]
+    return BusinessCalendar(holidays)
+
+
+@benchmark('datetime.BusinessCalendar.count')
+def _():
+    calendar = _business_calendar()
+    return lambda: calendar.count(date(2020, 3, 1), date(2029, 9, 1))
+
+
+@benchmark('datetime.BusinessCalendar.add')
+def _():
+    calendar = _business_calendar()
+    return lambda: calendar.add(date(2020, 3, 1), 2000)
+
+
+@benchmark('datetime.Cron.next')
+def _():
+    cron = Cron('30 4 * * MON-FRI')
+    now = Datetime(2024, 9, 20, 5, 7, 11)
+    return lambda: cron.next(now)
+
+
+@benchmark('datetime.Cron.next[minutely]')
+def _():
+    cron = Cron('*/5 * * * *')
+    now = Datetime(2024, 9, 20, 5, 7, 11)
+    return lambda: cron.next(now)
+
+
+def _zone():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo('America/New_York')
+    except Exception:
+        return timezone(timedelta(hours=-5))
+
+
+@benchmark('datetime.ZoneConverter.convert_many')
+def _():
+    converter = ZoneConverter.of(_zone())
+    moments = list(_column(1000))
+    return lambda: list(converter.convert_many(moments))
+
+
+@benchmark('datetime.ZoneConverter.convert_many[astimezone]')
+def _():
+    zone = _zone()
+    moments = [datetime.replace(moment, tzinfo=timezone.utc) for moment in _column(1000)]
+    return lambda: [moment.astimezone(zone) for moment in moments]
+
+
+@benchmark('datetime.ZoneConverter.localize')
+def _():
+    converter = ZoneConverter.of(_zone())
+    column = _column()
+    return lambda: converter.localize(column)
+
+
+def _bookings() -> IntervalSet:
+    # 一年里每天三段预约
+    start = Datetime(2024, 1, 1)
+    return IntervalSet(
+        (start + timedelta(days=day, hours=hour), start + timedelta(days=day, hours=hour + 1))
+        for day in range(366) for hour in (9, 13, 16)
+    )
+
+
+@benchmark('datetime.IntervalSet.gaps')
+def _():
+    bookings = _bookings()
+    start, end = Datetime(2024, 9, 20), Datetime(2024, 9, 27)
+    return lambda: list(bookings.gaps(start, end, timedelta(hours=2)))
+
+
+@benchmark('datetime.IntervalSet.add')
+def _():
+    bookings = _bookings()
+    start, end = Datetime(2024, 9, 20, 10), Datetime(2024, 9, 20, 11)
+    return lambda: bookings.add(start, end)
+
+
+@benchmark('datetime.CoarseClock.now')
+def _():
+    return CoarseClock(timedelta(milliseconds=1)).now
+
+
+@benchmark('datetime.CoarseClock.now[datetime.now]')
+def _():
+    return datetime.now
+
+
+@benchmark('datetime.CoarseClock.now[Datetime.now]')
+def _():
+    return Datetime.now
+
+
+@benchmark('datetime.daterange')
+def _():
+    start, stop = date(2024, 1, 1), date(2025, 1, 1)
+    return lambda: list(daterange(start, stop))
+
+
+@benchmark('datetime.weekrange')
+def _():
+    return lambda: list(weekrange(2024, 37))
+
+
+# ---- 枚举 ----
+
+class _Grade(Items):
+    FRESHMAN = 1, 'FR', 'Freshman'
+    SOPHOMORE = 2, 'SO', 'Sophomore'
+    JUNIOR = 3, 'JR', 'Junior'
+    SENIOR = 4, 'SR', 'Senior'
+    GRADUATE = 5, 'GR', 'Graduate'
+
+    __properties__ = 'code', 'label'
+
+    @property
+    def code(self) -> str:
+        return self._code_
+
+    @property
+    def label(self) -> str:
+        return self._label_
+
+
+@benchmark('enum.ItemsMeta.__contains__')
+def _():
+    return lambda: 5 in _Grade
+
+
+@benchmark('enum.ItemsMeta.__contains__[member]')
+def _():
+    return lambda: _Grade.GRADUATE in _Grade
+
+
+@benchmark('enum.ItemsMeta.__contains__[missing]')
+def _():
+    return lambda: 6 in _Grade
+
+
+@benchmark('enum.ItemsMeta.by')
+def _():
+    return lambda: _Grade.by('code', 'SR')
+
+
+@benchmark('enum.ItemsMeta.names')
+def _():
+    return lambda: _Grade.names
+
+
+@benchmark('enum.ItemsMeta.values')
+def _():
+    return lambda: _Grade.values
+
+
+@benchmark('enum.ItemsMeta.items')
+def _():
+    return lambda: _Grade.items
+
+
+@benchmark('enum.ItemsMeta.choices')
+def _():
+    return lambda: _Grade.choices
+
+
+@benchmark('enum.ItemsMeta.__getattr__')
+def _():
+    return lambda: _Grade.codes
+
+
+# ---- 配置 ----
+
+@benchmark('config.datasize')
+def _():
+    return lambda: datasize('10KiB,1MiB')
+
+
+@benchmark('config.during')
+def _():
+    return lambda: during('1h,1m,1s')
+
+
+# ---- 二进制 ----
+
+def _series(size: int = 10_000) -> list[Datetime]:
+    start = Datetime(2024, 1, 1)
+    return [start + timedelta(seconds=i * 7) for i in range(size)]
+
+
+@benchmark('binary.encode_timeseries')
+def _():
+    series = _series()
+    return lambda: encode_timeseries(series, TimeFrame.SECOND)
+
+
+@benchmark('binary.decode_timeseries')
+def _():
+    data = encode_timeseries(_series(), TimeFrame.SECOND)
+    return lambda: list(decode_timeseries(data))
+
+
+# ---- 数学 ----
+
+@benchmark('math.bitstream')
+def _():
+    return lambda: list(bitstream(0x5A5A_5A5A_5A5A_5A5A))
+
+
+@benchmark('math.digitstream')
+def _():
+    return lambda: list(digitstream(0x5A5A_5A5A_5A5A_5A5A, 16))
+
+
+# ---- 字符串 ----
+
+@benchmark('string.randb62')
+def _():
+    return lambda: randb62(32)
+
+
+@benchmark('string.randb64')
+def _():
+    return lambda: randb64(32)
+
+
+@benchmark('string.case_camel_to_snake')
+def _():
+    return lambda: case_camel_to_snake('CombineOrderSKUModel')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,28 @@
 """
 二进制相关。
 """
+from __future__ import annotations
 
 __all__ = [
     'randbytes',
+    'zigzag',
+    'unzigzag',
+    'encode_varints',
+    'decode_varints',
+    'encode_timeseries',
+    'decode_timeseries',
+    'dump_timeseries',
+    'load_timeseries',
 ]
 
+from datetime import datetime, timedelta, timezone
+from itertools import chain
 from random import getrandbits
+from typing import BinaryIO, Generator, Iterable, Union
+
+from zeraora.datetime import Datetime, Timedelta, TimeFrame
+
+Buffer = Union[bytes, bytearray, memoryview]
 
 
 def randbytes(n: int) -> bytes:
@@ -18,3 +34,201 @@ def randbytes(n: int) -> bytes:
     if n < 1:
         return b''
     return getrandbits(n * 8).to_bytes(n, 'little')
+
+
+def zigzag(n: int) -> int:
+    """
+    ZigZag 编码，将整数映射为非负整数，使绝对值小的负数也只需很少的字节：0, -1, 1, -2, 2 … 依次映射为 0, 1, 2, 3, 4 …
+    """
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def unzigzag(n: int) -> int:
+    """
+    ZigZag 解码，是 :func:`zigzag` 的逆运算。
+    """
+    return (n >> 1) ^ -(n & 1)
+
+
+def encode_varints(values: Iterable[int], out: bytearray = None) -> bytearray:
+    """
+    将若干个非负整数编码为 LEB128 变长整数，每个字节的低七位存放数据，最高位表示后面是否还有字节。
+
+    :param values: 非负整数。
+    :param out: 写入到哪里。默认新建一个。
+    :return: 写入了编码的 *out* 。
+    """
+    out = bytearray() if out is None else out
+    append = out.append
+    for n in values:
+        while n > 0x7F:
+            append(n & 0x7F | 0x80)
+            n >>= 7
+        append(n)
+    return out
+
+
+def decode_varints(chunks: Iterable[Buffer]) -> Generator[int, None, None]:
+    """
+    逐个解码 LEB128 变长整数，是 :func:`encode_varints` 的逆运算。
+
+    可以分成任意多块提供，一个整数可以跨越两块；传入 :class:`memoryview` 时不会复制数据。
+
+    :raise ValueError: 最后一个整数不完整。
+    """
+    n = shift = 0
+    for chunk in chunks:
+        for byte in memoryview(chunk).cast('B'):
+            n |= (byte & 0x7F) << shift
+            if byte & 0x80:
+                shift += 7
+            else:
+                yield n
+                n = shift = 0
+    if shift:
+        raise ValueError('数据不完整，最后一个变长整数被截断了。')
+
+
+# ---- 时间序列 ----
+
+_MAGIC = b'ZTS\x01'
+_NAIVE, _AWARE, _DELTA = 0, 1, 2
+_UNITS = {
+    TimeFrame.DAY: 86400_000000,
+    TimeFrame.HOUR: 3600_000000,
+    TimeFrame.MINUTE: 60_000000,
+    TimeFrame.SECOND: 1_000000,
+    TimeFrame.MICROSECOND: 1,
+}
+_EPOCHS = {
+    _NAIVE: Datetime(1970, 1, 1),
+    _AWARE: Datetime(1970, 1, 1, tzinfo=timezone.utc),
+    _DELTA: Timedelta(),
+}
+_NAMES = {
+    _NAIVE: '不带时区的日期时间',
+    _AWARE: '带时区的日期时间',
+    _DELTA: '时间差',
+}
+_US = timedelta(microseconds=1)
+
+
+def _kind(value: datetime | timedelta) -> int:
+    if isinstance(value, timedelta):
+        return _DELTA
+    if isinstance(value, datetime):
+        return _NAIVE if value.tzinfo is None else _AWARE
+    raise TypeError(f'只能编码 datetime 或 timedelta ，而不是 {type(value).__name__} 。')
+
+
+def _encode(values: Iterable[datetime | timedelta], frame: TimeFrame) -> Generator[bytearray, None, None]:
+    """
+    逐块编码时间序列，第一块是文件头。
+    """
+    if frame not in _UNITS:
+        raise ValueError(f'不支持按 {frame!r} 编码，只支持按天及更小的单位。')
+    unit = _UNITS[frame]
+    values = iter(values)
+    first = next(values, None)
+    if first is None:
+        yield bytearray(_MAGIC + bytes((_NAIVE, frame)))
+        return
+    kind = _kind(first)
+    epoch = _EPOCHS[kind]
+    yield bytearray(_MAGIC + bytes((kind, frame)))
+
+    previous = 0
+    chunk = []
+    for moment in chain((first,), values):
+        other = _kind(moment)
+        if other != kind:
+            raise ValueError(f'不能混合编码{_NAMES[kind]}和{_NAMES[other]}。')
+        # 按精度向下取整，再与上一个值作差
+        current = (moment - epoch) // _US // unit
+        delta = current - previous
+        chunk.append(delta << 1 if delta >= 0 else (-delta << 1) - 1)
+        previous = current
+        if len(chunk) >= 4096:
+            yield encode_varints(chunk)
+            chunk = []
+    yield encode_varints(chunk)
+
+
+def _decode(header: Buffer, chunks: Iterable[Buffer]) -> Generator[Datetime | Timedelta, None, None]:
+    header = bytes(header)
+    if len(header) != 6 or header[:4] != _MAGIC or header[4] not in _EPOCHS or header[5] not in _UNITS:
+        raise ValueError('不是 encode_timeseries() 编码的数据。')
+    kind, unit = header[4], _UNITS[header[5]]
+    current = 0
+    if kind == _DELTA:
+        for n in decode_varints(chunks):
+            current += (n >> 1) ^ -(n & 1)
+            yield Timedelta(microseconds=current * unit)
+    else:
+        epoch, step = _EPOCHS[kind], _US * unit
+        for n in decode_varints(chunks):
+            current += (n >> 1) ^ -(n & 1)
+            moment = epoch + step * current
+            # Python 3.8 以前，datetime 子类与 timedelta 相加得到的是 datetime ，须显式转换
+            yield moment if type(moment) is Datetime else Datetime.fromdatetime(moment)
+
+
+def encode_timeseries(
+        values: Iterable[datetime | timedelta],
+        frame: TimeFrame = TimeFrame.MICROSECOND,
+) -> bytes:
+    """
+    将时间序列编码为紧凑的二进制数据。
+
+    以第一个值为基准，之后每个值只保存与前一个值之差，差值经 :func:`zigzag` 和 LEB128 变长整数编码，
+    因此有序或大致有序的序列中每个值通常只需一到三个字节。带时区的日期时间会先转换为 UTC 。
+
+    >>> moments = [Datetime(2024, 9, 20, 0, m, s) for m in range(10) for s in range(0, 60, 5)]
+    >>> len(encode_timeseries(moments, TimeFrame.SECOND))
+    130
+
+    :param values: 全是 :class:`datetime` 或全是 :class:`timedelta` 的序列。
+    :param frame: 精度，更小的部分会被舍去。只支持 :attr:`TimeFrame.DAY` 及更小的单位。
+    :return: 二进制数据。
+    :raise TypeError: 含有既不是 :class:`datetime` 也不是 :class:`timedelta` 的值。
+    :raise ValueError: 精度不受支持，或者混合了带时区的日期时间、不带时区的日期时间和时间差。
+    """
+    return b''.join(_encode(values, frame))
+
+
+def decode_timeseries(data: Buffer) -> Generator[Datetime | Timedelta, None, None]:
+    """
+    逐个解码 :func:`encode_timeseries` 编码的时间序列。直接在 :class:`memoryview` 上解码，不会复制数据。
+
+    :return: 生成 :class:`Datetime` 或 :class:`Timedelta` 对象的生成器。
+    :raise ValueError: 数据有误。
+    """
+    view = memoryview(data).cast('B')
+    return _decode(view[:6], (view[6:],))
+
+
+def dump_timeseries(
+        values: Iterable[datetime | timedelta],
+        fp: BinaryIO,
+        frame: TimeFrame = TimeFrame.MICROSECOND,
+) -> int:
+    """
+    将时间序列逐块编码并写入文件，格式与 :func:`encode_timeseries` 相同，不需要一次性将序列读入内存。
+
+    :return: 写入的字节数。
+    """
+    size = 0
+    for chunk in _encode(values, frame):
+        fp.write(chunk)
+        size += len(chunk)
+    return size
+
+
+def load_timeseries(fp: BinaryIO, chunk_size: int = 1 << 16) -> Generator[Datetime | Timedelta, None, None]:
+    """
+    从文件中逐块读取并解码时间序列，不需要一次性将文件读入内存。
+
+    :param fp: 以二进制模式打开的文件。
+    :param chunk_size: 每次读取多少字节。
+    """
+    return _decode(fp.read(6), iter(lambda: fp.read(chunk_size), b''))
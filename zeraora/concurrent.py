@@ -0,0 +1,255 @@
+"""
+并发相关工具。
+"""
+from __future__ import annotations
+
+__all__ = [
+    'partition',
+    'ChunkResult',
+    'Backfill',
+    'backfill',
+]
+
+import logging
+import os
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Executor, Future, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import date, datetime, time, timedelta
+from itertools import count, islice
+from time import sleep
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+from zeraora.datetime import BearTimer, TimeFrame, daterange, datetimerange
+
+# BearTimer 输出日志所用的 Logger
+_logger = logging.getLogger('zeraora.datetime')
+
+
+def partition(values: Iterable, size: int) -> Iterator[Sequence]:
+    """
+    将序列按顺序分成若干块，每块 *size* 个元素，最后一块可能不足。
+
+    :class:`DateRange` 、:class:`DatetimeRange` 等序列直接切片，每块仍是同类的范围对象，不会逐个展开；
+    其它可迭代对象则逐块收集成列表。
+
+    >>> list(partition(daterange(date(2024, 9, 1), date(2024, 9, 8)), 3))
+    [DateRange(datetime.date(2024, 9, 1), datetime.date(2024, 9, 4)), DateRange(datetime.date(2024, 9, 4), datetime.date(2024, 9, 7)), DateRange(datetime.date(2024, 9, 7), datetime.date(2024, 9, 8))]
+
+    :param values: 序列或任意可迭代对象。
+    :param size: 每块的元素个数。
+    :raise ValueError: *size* 不是正整数。
+    """
+    if size < 1:
+        raise ValueError('size must be a positive integer.')
+    if isinstance(values, Sequence):
+        for i in range(0, len(values), size):
+            yield values[i:i + size]
+        return
+    values = iter(values)
+    chunk = list(islice(values, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(values, size))
+
+
+class ChunkResult(NamedTuple):
+    """
+    一块数据的执行结果。
+    """
+    index: int
+    """第几块，从 0 开始。"""
+    chunk: Sequence
+    """这一块数据本身。"""
+    value: Any
+    """函数的返回值；失败时为 None 。"""
+    error: Optional[BaseException]
+    """最后一次重试仍然抛出的异常；成功时为 None 。"""
+    attempts: int
+    """一共执行了多少次，包括第一次。"""
+    elapsed: int
+    """包括所有重试在内的总耗时，单位为纳秒。"""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _attempt(
+        func: Callable[[Sequence], Any],
+        chunk: Sequence,
+        label: str,
+        retries: int,
+        backoff: float,
+) -> tuple[Any, Optional[BaseException], int, int]:
+    """
+    在工作线程或工作进程中执行一块数据，失败时重试，返回 ``(返回值, 异常, 执行次数, 纳秒耗时)`` 。
+
+    耗时不在这里汇总，而是交回调度方汇总到 :attr:`BearTimer.REGISTRY` ，否则进程池中的汇总会留在子进程里。
+    """
+    bear = BearTimer(label, stats=False)
+    # 一块数据的 repr 可能很长，只在确实会输出日志时才构造
+    bear.start(repr(chunk) if _logger.isEnabledFor(logging.DEBUG) else '')
+    for attempt in count(1):
+        try:
+            value = func(chunk)
+        except Exception as e:
+            if attempt > retries:
+                return None, e, attempt, bear.stop(f'Failed after {attempt} attempt(s): {e!r}')
+            bear.lap(f'Attempt {attempt} failed: {e!r}')
+            if backoff:
+                sleep(backoff * 2 ** (attempt - 1))
+        else:
+            return value, None, attempt, bear.stop()
+
+
+class Backfill:
+    """
+    将一段日期（或任意序列）分块，交给线程池或进程池并行执行，并逐块返回结果。
+
+    - 同一时刻最多只有 *inflight* 块已提交但尚未取走结果，不会一次性把所有块塞进执行器，
+      因此几年的日期范围也只占用很少的内存，结果也能边算边处理。
+    - 每块单独计时，按标题汇总到 :attr:`BearTimer.REGISTRY` ；失败时按指数退避重试。
+
+    >>> def load(days: DateRange) -> int:
+    >>>     ...  # 导入这几天的数据，返回行数
+    >>>
+    >>> runner = Backfill(load, chunk=7, workers=8)
+    >>> for result in runner.run(daterange(date(2024, 1, 1), date(2025, 1, 1))):
+    >>>     print(result.chunk.start, result.value, result.elapsed / 1e9)
+    >>> BearTimer.REGISTRY['load'].percentile(99)
+
+    使用进程池时，函数和每块数据都会被 :mod:`pickle` 序列化后传给子进程，因此函数须定义在模块的顶层。
+    """
+
+    def __init__(
+            self,
+            func: Callable[[Sequence], Any],
+            *,
+            chunk: int = 1,
+            workers: int = None,
+            executor: str | Executor = 'process',
+            inflight: int = None,
+            ordered: bool = True,
+            retries: int = 0,
+            backoff: float | timedelta = 0,
+            label: str = None,
+            return_exceptions: bool = False,
+    ):
+        """
+        :param func: 处理一块数据的函数，接收一块数据（见 :func:`partition` ）作为唯一参数。
+        :param chunk: 每块包含多少个元素。
+        :param workers: 最多同时执行多少块。默认由执行器决定，通常与 CPU 核数有关。
+        :param executor: ``'process'`` 使用进程池，适合 CPU 密集的任务；``'thread'`` 使用线程池，适合等待 I/O 的任务；
+                         也可以提供现成的 :class:`concurrent.futures.Executor` ，此时执行器不会被关闭，
+                         *workers* 只用于决定 *inflight* 的默认值，应与执行器的实际容量一致。
+        :param inflight: 最多有多少块已提交而尚未取走结果。默认为 *workers* 的两倍，以便工作者总有活干；
+                         未指定 *workers* 时为 CPU 核数的两倍。
+        :param ordered: 是否按分块的顺序返回结果。否则先完成的先返回，不会被一块慢的数据拖住。
+        :param retries: 失败后最多重试多少次。
+        :param backoff: 第一次重试前等待多久，之后每次翻倍。可以是秒数或 :class:`timedelta` 。
+        :param label: 汇总耗时所用的标题，默认是函数名。
+        :param return_exceptions: 重试后仍然失败时，是将异常放在结果中返回，还是直接抛出并取消其余的块。
+        """
+        if chunk < 1:
+            raise ValueError('chunk must be a positive integer.')
+        if workers is not None and workers < 1:
+            raise ValueError('workers must be a positive integer.')
+        if inflight is not None and inflight < 1:
+            raise ValueError('inflight must be a positive integer.')
+        if retries < 0:
+            raise ValueError('retries must not be negative.')
+        if isinstance(executor, str) and executor not in ('process', 'thread'):
+            raise ValueError(f"executor must be 'process', 'thread' or an Executor, not {executor!r}.")
+        self.func = func
+        self.chunk = chunk
+        self.workers = workers
+        self.executor = executor
+        self.inflight = inflight
+        self.ordered = ordered
+        self.retries = retries
+        self.backoff = backoff.total_seconds() if isinstance(backoff, timedelta) else backoff
+        self.label = label or getattr(func, '__name__', repr(func))
+        self.return_exceptions = return_exceptions
+
+    def _executor(self) -> tuple[Executor, bool]:
+        if isinstance(self.executor, Executor):
+            return self.executor, False
+        if self.executor == 'thread':
+            return ThreadPoolExecutor(self.workers), True
+        return ProcessPoolExecutor(self.workers), True
+
+    def run(self, values: Iterable) -> Iterator[ChunkResult]:
+        """
+        分块执行，每完成一块就返回一块的结果。
+
+        结果须被逐个取走才会提交后面的块；提前停止迭代会取消所有尚未开始的块。
+
+        :param values: 要处理的数据，通常是 :func:`daterange` 或 :func:`datetimerange` 的返回值。
+        :return: 生成 :class:`ChunkResult` 的迭代器。
+        :raise Exception: 未设置 *return_exceptions* 时，某一块重试后仍然失败所抛出的异常。
+        """
+        executor, owned = self._executor()
+        limit = self.inflight or 2 * (self.workers or os.cpu_count() or 1)
+        chunks = enumerate(partition(values, self.chunk))
+        pending: deque[tuple[int, Sequence, Future]] = deque()
+        try:
+            for following in islice(chunks, limit):
+                pending.append(self._submit(executor, *following))
+            while pending:
+                if self.ordered:
+                    index, chunk, future = pending.popleft()
+                else:
+                    done, _ = wait([future for *_, future in pending], return_when=FIRST_COMPLETED)
+                    index, chunk, future = next(item for item in pending if item[2] in done)
+                    pending.remove((index, chunk, future))
+                value, error, attempts, elapsed = future.result()
+                BearTimer.REGISTRY.record(self.label, elapsed)
+                # 取走一块再补上一块，使在途的块数保持不变
+                following = next(chunks, None)
+                if following is not None:
+                    pending.append(self._submit(executor, *following))
+                if error is not None and not self.return_exceptions:
+                    raise error
+                yield ChunkResult(index, chunk, value, error, attempts, elapsed)
+        finally:
+            for *_, future in pending:
+                future.cancel()
+            if owned:
+                executor.shutdown(wait=True)
+
+    def _submit(self, executor: Executor, index: int, chunk: Sequence) -> tuple[int, Sequence, Future]:
+        return index, chunk, executor.submit(_attempt, self.func, chunk, self.label, self.retries, self.backoff)
+
+    __call__ = run
+
+
+def backfill(
+        func: Callable[[Sequence], Any],
+        start: date,
+        stop: date,
+        step: int = 1,
+        frame: TimeFrame = TimeFrame.DAY,
+        closed=False,
+        **options,
+) -> Iterator[ChunkResult]:
+    """
+    在一段时间内按 *frame* 和 *step* 分步，再分块并行执行 *func* ，是 :class:`Backfill` 的简便写法。
+
+    *start* 和 *stop* 都是 :class:`date` 且按天分步时，每块是 :class:`DateRange` ，否则是 :class:`DatetimeRange` 。
+
+    >>> for result in backfill(load, date(2024, 1, 1), date(2025, 1, 1), chunk=7, executor='thread'):
+    >>>     print(result.chunk.start, result.value)
+
+    :param options: 传给 :class:`Backfill` 的其它参数。
+    :return: 生成 :class:`ChunkResult` 的迭代器。
+    """
+    if frame == TimeFrame.DAY and not isinstance(start, datetime) and not isinstance(stop, datetime):
+        values = daterange(start, stop, step, closed)
+    else:
+        if not isinstance(start, datetime):
+            start = datetime.combine(start, time())
+        if not isinstance(stop, datetime):
+            stop = datetime.combine(stop, time())
+        values = datetimerange(start, stop, step, frame, closed)
+    return Backfill(func, **options).run(values)
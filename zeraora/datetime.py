@@ -4,29 +4,543 @@
 from __future__ import annotations
 
 __all__ = [
+    'TimerStats',
+    'TimerRegistry',
+    'Span',
+    'TimerTracer',
+    'Lap',
     'BearTimer',
     'is_leap',
     'get_last_monthday',
     'TimeFrame',
     'Datetime',
     'Timedelta',
+    'DatetimeArray',
+    'Bucket',
+    'bucketize',
+    'DateRange',
     'daterange',
     'weekrange',
+    'DatetimeRange',
+    'datetimerange',
+    'IntervalSet',
+    'BusinessCalendar',
+    'Schedule',
+    'Cron',
+    'Every',
+    'ZoneConverter',
+    'CoarseClock',
 ]
 
+import heapq
+import json
 import logging
+import operator
+import re
 import sys
-from datetime import datetime, timedelta, MINYEAR, MAXYEAR, date, time, tzinfo
+import threading
+import tracemalloc
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Sequence
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone, MINYEAR, MAXYEAR, date, time, tzinfo
 from enum import IntEnum
-from functools import wraps
-from threading import Lock
-from typing import Generator, Optional
+from functools import lru_cache, wraps
+from inspect import iscoroutinefunction
+from itertools import count
+from math import ceil, gcd
+from random import random
+from time import monotonic_ns, perf_counter_ns, thread_time_ns, time_ns
+from typing import Callable, Generator, Iterable, Iterator, NamedTuple, Optional
+from weakref import ref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 logger = logging.getLogger('zeraora.datetime')
 
 
+class TimerStats:
+    """
+    某个计时器的耗时统计。
+
+    累计次数、总和、最小值与最大值，并以对数分桶（HDR 风格）的直方图近似记录分布，
+    使得无论记录多少次，占用的内存都是有限的，且随时可以查询分位数。
+
+    - 所有数值的单位均为纳秒。
+    - 小于 ``2 ** SUB_BITS`` 的值精确记录，更大的值相对误差不超过 ``2 ** (1 - SUB_BITS)`` 。
+    - 抽样记录时，每个样本都带有它所代表的调用次数（权重），累计到 :attr:`calls` ，
+      用 :attr:`rate` 可以将总和等累计值换算回全部调用的估计值。
+
+    >>> stats = TimerStats()
+    >>> for ns in range(1, 1001):
+    >>>     stats.record(ns * 1000)
+    >>> stats.percentile(50)
+    499711
+    >>> stats.snapshot()
+    {'count': 1000, 'calls': 1000, 'rate': 1.0, 'total': 500500000, 'min': 1000, 'max': 1000000, ...}
+    """
+    __slots__ = 'count', 'calls', 'total', 'min', 'max', '_buckets', '_lock'
+
+    SUB_BITS = 5
+    """每个二次幂区间再细分为 ``2 ** (SUB_BITS - 1)`` 个桶。"""
+
+    def __init__(self):
+        self.count: int = 0
+        self.calls: int | float = 0
+        self.total: int = 0
+        self.min: int = 0
+        self.max: int = 0
+        self._buckets: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        shift = value.bit_length() - cls.SUB_BITS
+        if shift <= 0:
+            return value
+        return (shift << (cls.SUB_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def _bounds(cls, index: int) -> tuple[int, int]:
+        half = 1 << (cls.SUB_BITS - 1)
+        if index < half << 1:
+            return index, index + 1
+        shift = index // half - 1
+        sub = index - shift * half
+        return sub << shift, (sub + 1) << shift
+
+    def record(self, value: int, weight: int | float = 1):
+        """
+        记录一次耗时。
+
+        :param value: 耗时（纳秒）。
+        :param weight: 这次记录代表了多少次调用。不抽样时就是 ``1`` 。
+        """
+        value = max(int(value), 0)
+        index = self._index(value)
+        with self._lock:
+            if self.count == 0 or value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+            self.count += 1
+            self.calls += weight
+            self.total += value
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        """
+        平均耗时。没有任何记录时为 ``0.0`` 。
+        """
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def rate(self) -> float:
+        """
+        抽样率，即记录次数与所代表的调用次数之比。没有任何记录时为 ``1.0`` 。
+        """
+        return self.count / self.calls if self.calls else 1.0
+
+    def percentile(self, q: float) -> int:
+        """
+        计算分位数。
+
+        :param q: 百分位，取值范围是 ``[0, 100]`` 。
+        :return: 落在相应桶内的近似值。没有任何记录时为 ``0`` 。
+        """
+        if not 0 <= q <= 100:
+            raise ValueError('percentile must be in the range [0, 100].')
+        with self._lock:
+            if self.count == 0:
+                return 0
+            rank = max(ceil(q / 100 * self.count), 1)
+            if rank == 1:
+                return self.min
+            if rank == self.count:
+                return self.max
+            seen = 0
+            for index in sorted(self._buckets):
+                seen += self._buckets[index]
+                if seen >= rank:
+                    lower, upper = self._bounds(index)
+                    return min(max((lower + upper - 1) // 2, self.min), self.max)
+            return self.max  # pragma: no cover
+
+    def snapshot(self) -> dict[str, int | float]:
+        """
+        当前统计结果的快照，包括次数、估计调用次数、抽样率、总和、最值、平均值及 p50、p95、p99 分位数。
+        """
+        return dict(
+            count=self.count,
+            calls=self.calls,
+            rate=self.rate,
+            total=self.total,
+            min=self.min,
+            max=self.max,
+            mean=self.mean,
+            p50=self.percentile(50),
+            p95=self.percentile(95),
+            p99=self.percentile(99),
+        )
+
+    def reset(self):
+        """
+        清空所有记录。
+        """
+        with self._lock:
+            self.count = self.calls = self.total = self.min = self.max = 0
+            self._buckets = {}
+
+
+class TimerRegistry:
+    """
+    按计时器标题（label）汇总耗时统计的登记处。
+
+    >>> registry = TimerRegistry()
+    >>> registry.record('query_status', 1_250_000)
+    >>> registry['query_status'].count
+    1
+    >>> registry.snapshot(reset=True)
+    {'query_status': {'count': 1, 'total': 1250000, ...}}
+    """
+
+    def __init__(self):
+        self._stats: dict[str, TimerStats] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, label: str) -> TimerStats:
+        return self._stats[label]
+
+    def __contains__(self, label: str) -> bool:
+        return label in self._stats
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._stats))
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def get(self, label: str) -> TimerStats:
+        """
+        获取某个标题的统计，不存在时自动创建。
+        """
+        stats = self._stats.get(label)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(label, TimerStats())
+        return stats
+
+    def record(self, label: str, value: int, weight: int | float = 1):
+        """
+        为某个标题记录一次耗时（纳秒）。
+
+        :param weight: 这次记录代表了多少次调用。
+        """
+        self.get(label).record(value, weight)
+
+    def snapshot(self, reset=False) -> dict[str, dict[str, int | float]]:
+        """
+        所有标题的统计结果快照。
+
+        :param reset: 是否在获取快照后清空所有记录。
+        """
+        with self._lock:
+            stats = self._stats
+            if reset:
+                self._stats = {}
+        return {label: s.snapshot() for label, s in stats.items()}
+
+    def reset(self, label: str = None):
+        """
+        清空某个标题的记录；不提供标题时清空所有记录。
+        """
+        with self._lock:
+            if label is None:
+                self._stats = {}
+            else:
+                self._stats.pop(label, None)
+
+
+class Span(NamedTuple):
+    """
+    一次已结束的计时。时刻与耗时的单位均为纳秒。
+    """
+    stack: tuple[str, ...]
+    """从最外层到这次计时自身的所有标题。"""
+    start: int
+    """开始时刻。"""
+    end: int
+    """结束时刻。"""
+    exclusive: int
+    """不含内层计时的耗时（即自身耗时）。"""
+    thread: int
+    """所在线程的标识；在 asyncio 任务中则是任务的标识。"""
+
+    @property
+    def name(self) -> str:
+        """
+        这次计时的标题。
+        """
+        return self.stack[-1]
+
+
+class TimerTracer:
+    """
+    收集所有已结束的计时，以还原计时之间的嵌套关系。
+
+    在一个计时器的计时过程中开始的其它计时器，会自动成为它的内层计时，无论是否是同一个对象、
+    是装饰器还是 ``with`` 语句。收集到的数据可以导出为
+    `Chrome Trace Event <https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU>`_
+    格式（可在 chrome://tracing 或 https://ui.perfetto.dev 中查看），
+    或折叠栈（collapsed stack）格式（可交给 flamegraph.pl、speedscope 等工具绘制火焰图）。
+
+    >>> BearTimer.TRACER.enable()
+    >>> with BearTimer('request'):
+    >>>     with BearTimer('query'):
+    >>>         pass
+    >>> BearTimer.TRACER.dump_chrome_trace('trace.json')
+    >>> BearTimer.TRACER.dump_collapsed('trace.folded')
+
+    :param capacity: 最多保留多少个计时，超出后丢弃最早的计时。
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.enabled = False
+        self._spans: deque[Span] = deque(maxlen=capacity)
+
+    def enable(self):
+        """
+        开始收集。
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        停止收集，但不清除已收集的计时。
+        """
+        self.enabled = False
+
+    def clear(self):
+        """
+        清除已收集的计时。
+        """
+        self._spans.clear()
+
+    @property
+    def spans(self) -> list[Span]:
+        """
+        已收集的计时，按结束的先后排列。
+        """
+        return list(self._spans)
+
+    def _record(self, run: _Run, exclusive: int):
+        stack = []
+        node = run
+        while node is not None:
+            stack.append(node.label)
+            node = node.parent
+        self._spans.append(Span(tuple(reversed(stack)), run.head, run.prev, exclusive, self._thread()))
+
+    @staticmethod
+    def _thread() -> int:
+        asyncio = sys.modules.get('asyncio')
+        if asyncio is not None:
+            try:
+                task = asyncio.current_task()
+            except RuntimeError:
+                task = None
+            if task is not None:
+                return id(task)
+        return threading.get_ident()
+
+    def chrome_trace(self) -> dict:
+        """
+        转换为 Chrome Trace Event 格式的对象。
+        """
+        return dict(
+            traceEvents=[
+                dict(
+                    name=span.name,
+                    cat='BearTimer',
+                    ph='X',
+                    ts=span.start / 1000,
+                    dur=(span.end - span.start) / 1000,
+                    pid=0,
+                    tid=span.thread,
+                    args=dict(stack=';'.join(span.stack)),
+                )
+                for span in self._spans
+            ],
+            displayTimeUnit='ms',
+        )
+
+    def collapsed(self) -> dict[str, int]:
+        """
+        转换为折叠栈格式，即每一条调用栈及其自身耗时（微秒）的总和。
+        """
+        stacks: dict[str, int] = {}
+        for span in self._spans:
+            key = ';'.join(span.stack)
+            stacks[key] = stacks.get(key, 0) + span.exclusive
+        return {key: ns // 1000 for key, ns in stacks.items()}
+
+    def dump_chrome_trace(self, path: str):
+        """
+        将 Chrome Trace Event 格式的数据写入文件。
+        """
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+    def dump_collapsed(self, path: str):
+        """
+        将折叠栈格式的数据写入文件，每行是一条调用栈及其自身耗时（微秒）。
+        """
+        with open(path, 'w', encoding='UTF-8') as f:
+            for stack, us in self.collapsed().items():
+                f.write(f'{stack} {us}\n')
+
+
+class Lap(NamedTuple):
+    """
+    计时器的一次记录。
+    """
+    time: datetime
+    """记录的时刻。"""
+    delta: timedelta
+    """距上一次记录的时间差。"""
+    cpu: Optional[timedelta]
+    """距上一次记录所消耗的 CPU 时间。未启用时为 ``None`` 。"""
+    allocated: Optional[int]
+    """距上一次记录净分配的内存字节数，可能为负数。未启用时为 ``None`` 。"""
+    peak: Optional[int]
+    """距上一次记录，内存用量最多时比上一次记录时多出的字节数。未启用时为 ``None`` 。"""
+
+
+class _Run:
+    """
+    计时器的一次计时。
+
+    正在进行的计时按开始的先后串成一条链，存放在上下文变量中，
+    因此不同线程、不同 asyncio 任务使用同一个计时器时，各自的标记互不干扰。
+    链上只弱引用计时器，计时器被回收后，未停止的计时也会在下次开始计时时被跳过。
+
+    每个标记以距开始时刻的纳秒数存放在 ``array('q')`` 中；限定容量时，数组作为环形缓冲区使用，
+    只保留最近的若干个标记，而开始时刻、上次时刻和标记总数始终是准确的。
+    前两个标记分别是 0 和 ``prev - head`` ，无需保存，因此数组在第三个标记到来时才创建，
+    只开始、停止一次的计时（比如被装饰的函数、``with`` 语句）不必创建数组。
+    CPU 时间与内存用量（如果需要的话）存放在与标记一一对应的另外几个数组中。
+    """
+    __slots__ = (
+        'timer', 'label', 'parent', 'size',
+        'epoch', 'head', 'prev', 'count', 'marks',
+        'cpu_head', 'cpu_prev', 'cpus', 'sizes', 'peaks',
+        'inner', 'weight',
+    )
+
+    def __init__(self, timer: ref, label: str, parent: Optional[_Run], capacity: Optional[int]):
+        self.timer = timer
+        self.label = label
+        self.parent = parent
+        # 多留一格，使最早的那个保留下来的标记也能算出距上次的时间差。
+        self.size = None if capacity is None else capacity + 1
+        self.inner = 0  # 内层计时的耗时总和
+        self.weight = 1  # 抽样时这次计时代表的调用次数
+
+    def reset(self, epoch: int, head: int, cpu: Optional[int], size: Optional[int]):
+        self.epoch = epoch  # 开始时的墙上时间，仅用于换算 records
+        self.head = head
+        self.prev = head
+        self.count = 1
+        self.marks = None
+        self.cpu_head = self.cpu_prev = cpu
+        self.cpus = None if cpu is None else array('q', (0,))
+        self.sizes = None if size is None else array('q', (size,))
+        self.peaks = None if size is None else array('q', (size,))
+
+    def offsets(self) -> list[int]:
+        if self.marks is None:
+            return [0] if self.count == 1 else [0, self.prev - self.head]
+        return self.ordered(self.marks)
+
+    def ordered(self, values: array) -> list[int]:
+        if self.size is None or self.count <= self.size:
+            return values.tolist()
+        split = self.count % self.size
+        return values[split:].tolist() + values[:split].tolist()
+
+
+_running: ContextVar[Optional[_Run]] = ContextVar('zeraora.datetime.running', default=None)
+
+
+class _Sampler:
+    """
+    决定被装饰函数的某次调用是否需要计时，以及这次计时代表了多少次调用。
+    """
+    __slots__ = 'take', '_every', '_rate', '_interval', '_counter', '_last', '_due', '_lock'
+
+    def __init__(self, sample: int | float | timedelta):
+        if isinstance(sample, bool) or not isinstance(sample, (int, float, timedelta)):
+            raise TypeError(
+                'sample must be an int, a float or a timedelta.'
+            )
+        self._counter = count()
+        self._last = 0
+        self._due = 0
+        if isinstance(sample, int):
+            if sample < 1:
+                raise ValueError('sample must be a positive integer.')
+            self._every = sample
+            self.take = self._take_every
+        elif isinstance(sample, float):
+            if not 0 < sample <= 1:
+                raise ValueError('sample must be a probability in the range (0, 1].')
+            self._rate = sample
+            self.take = self._take_rate
+        else:
+            if sample <= timedelta():
+                raise ValueError('sample must be a positive timedelta.')
+            self._interval = sample // timedelta(microseconds=1) * 1000
+            self._lock = threading.Lock()
+            self.take = self._take_interval
+
+    def _take_every(self) -> int:
+        return self._every if next(self._counter) % self._every == 0 else 0
+
+    def _take_rate(self) -> float:
+        return 1 / self._rate if random() < self._rate else 0
+
+    def _take_interval(self) -> int:
+        seen = next(self._counter) + 1
+        now = perf_counter_ns()
+        if now < self._due:
+            return 0
+        # 只在到期时加锁，并在锁内再判断一次，以免多个线程同时到期时重复计时
+        with self._lock:
+            if now < self._due or seen <= self._last:
+                return 0
+            self._due = now + self._interval
+            weight = seen - self._last
+            self._last = seen
+        return weight
+
+
 class BearTimer:
-    __slots__ = '_label', '_marks', '_point'
+    __slots__ = (
+        '_label', '_clock', '_cpu', '_memory', '_stats', '_sampler', '_capacity', '_last', '_ref', '__weakref__',
+    )
+
+    REGISTRY = TimerRegistry()
+    """默认的耗时统计登记处。每次 :meth:`stop` 时都会将总耗时按标题汇总到这里。"""
+
+    TRACER = TimerTracer()
+    """默认的计时收集器。启用后每次 :meth:`stop` 时都会将这次计时连同它的外层计时收集到这里。"""
 
     CONFIG = dict(
         version=1,
@@ -58,10 +572,27 @@ class BearTimer:
         },
     )
 
-    def __init__(self, label: str = None, *_, **__):
+    def __init__(
+            self,
+            label: str = None,
+            *_,
+            clock: Callable[[], int] = perf_counter_ns,
+            stats: bool = True,
+            sample: int | float | timedelta = None,
+            capacity: int = None,
+            cpu: bool | Callable[[], int] = False,
+            memory: bool = False,
+            **__,
+    ):
         """
         熊牌秒表。对代码运行进行计时，并向名为 "zeraora.datetime" 的 Logger 发送 DEBUG 等级的日志。
 
+        - 每次记录只保存时钟返回的整数纳秒，日期时间对象仅在访问 :attr:`records` 或 :attr:`details` 时才会构造。
+        - 日志消息会推迟到真正输出时才格式化；Logger 未启用 DEBUG 等级时，:meth:`lap` 只会记下时刻而不做其它事情。
+        - 每次开始和停止计时（包括装饰器和 ``with`` 语句）仍然需要读取时钟、在上下文变量中登记这次计时，
+          并在停止时加锁汇总到 :attr:`REGISTRY` ；只开始、停止一次时不会创建保存标记的数组。
+          调用非常频繁时，可以用 *stats* 关闭汇总，或者用 *sample* 只对部分调用计时。
+
         ----
 
         使用前，需要先启用日志输出： ::
@@ -125,6 +656,18 @@ class BearTimer:
         >>>     # 业务逻辑
         >>>     pass
 
+        异步函数同样可以使用装饰器，计时范围是整个协程的执行过程，而不仅仅是创建协程；
+        在协程中也可以使用 ``async with`` 语句：
+
+        >>> @BearTimer()
+        >>> async def query_status(request, *args, **kwargs):
+        >>>     async with BearTimer('fetch'):
+        >>>         await asyncio.sleep(1)
+
+        计时标记保存在上下文变量（:mod:`contextvars`）中，而不是计时器对象上，
+        因此同一个计时器（包括被装饰的函数）被多个线程或多个 asyncio 任务同时使用时，
+        各自的标记互不干扰，也无需加锁。
+
         此外还可以实例化一个对象。每个对象都是独立的计时器，互不影响。
 
         >>> bear = BearTimer()
@@ -132,7 +675,44 @@ class BearTimer:
         >>> # 业务逻辑
         >>> bear.stop()
 
+        手动调用 :meth:`start` 后请务必调用 :meth:`stop` ，否则这次计时会一直留在当前上下文中。
+
+        每次停止计时，总耗时都会按标题汇总到 :attr:`BearTimer.REGISTRY` ，可以随时查询分位数：
+
+        >>> BearTimer.REGISTRY['query_status'].percentile(99)
+        1250000
+        >>> BearTimer.REGISTRY.snapshot(reset=True)
+        {'query_status': {'count': 10000, 'total': ..., 'p50': ..., 'p95': ..., 'p99': ...}}
+
+        CPU 时间和内存用量可以帮助判断一段代码慢在计算、等待 I/O 还是内存分配：
+
+        >>> with BearTimer(cpu=True, memory=True) as bear:
+        >>>     # 业务逻辑
+        >>>     bear.lap()
+        [2024-09-17 14:35:21,123] [DEBUG] [query_status] [0.012345678 +0.012345678] [cpu +0.000456789] [mem +2048B peak 4096B]:
+
+        对于调用非常频繁的函数，可以只对部分调用计时，汇总时会记下每次计时代表了多少次调用：
+
+        >>> @BearTimer(sample=100)  # 每 100 次调用计时一次
+        >>> @BearTimer(sample=0.01)  # 每次调用有 1% 的概率被计时
+        >>> @BearTimer(sample=timedelta(seconds=1))  # 每秒最多计时一次
+
+        嵌套的计时会自动形成父子关系，启用 :attr:`BearTimer.TRACER` 后可以导出为火焰图等格式，
+        详见 :class:`TimerTracer` 。
+
         :param label: 计时器的标题，用以标明输出信息归属于哪个计时器。默认从打印消息时的上下文中获取。
+        :param clock: 计时所用的时钟，须返回以纳秒为单位的整数。默认使用单调的 :func:`time.perf_counter_ns` ，
+                      不受系统时间调整的影响；如需使用墙上时间可以改为 :func:`time.time_ns` 。
+        :param stats: 是否在停止计时时将总耗时汇总到 :attr:`BearTimer.REGISTRY` 。
+        :param sample: 作为装饰器时只对部分调用计时，其余调用不计时、不输出日志也不汇总。
+                       整数 ``N`` 表示每 N 次调用抽取一次；``(0, 1]`` 之间的小数表示每次调用被抽取的概率；
+                       :class:`timedelta` 表示每隔多长时间最多抽取一次。默认不抽样。
+        :param capacity: 每次计时最多保留多少个记录，超出后丢弃最早的记录，
+                         适合在长期存在的计时器上反复调用 :meth:`lap` 。默认不限制。
+        :param cpu: 是否同时记录 CPU 时间。``True`` 表示使用当前线程的 CPU 时间 :func:`time.thread_time_ns` ，
+                    也可以提供其它返回纳秒整数的函数，比如整个进程的 :func:`time.process_time_ns` 。
+        :param memory: 是否同时记录内存用量，即 :mod:`tracemalloc` 追踪到的净分配字节数和峰值。
+                       如果 :mod:`tracemalloc` 尚未开始追踪，会在开始计时时自动开始，这会拖慢整个程序的运行。
         """
         try:
             # noinspection PyUnresolvedReferences,PyProtectedMember
@@ -140,36 +720,230 @@ class BearTimer:
         except AttributeError:
             context = ''
         self._label = context if not label and hasattr(sys, '_getframe') else str(label)
-        self._marks: list[tuple[datetime, timedelta]] = []
-        self._point: int = 0
+        self._clock = clock
+        self._cpu = thread_time_ns if cpu is True else (cpu or None)
+        self._memory = memory
+        self._stats = stats
+        self._sampler = None if sample is None else _Sampler(sample)
+        if capacity is not None and capacity < 1:
+            raise ValueError('capacity must be a positive integer.')
+        self._capacity = capacity
+        self._last: Optional[_Run] = None
+        self._ref = ref(self)  # 每次计时都弱引用计时器，共用同一个弱引用对象
 
     def __call__(self, func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            self._label = func.__name__
-            self.start()
-            returns = func(*args, **kwargs)
-            self.stop()
-            return returns
+        # 标题在装饰时就确定下来，每次调用都只修改属于自己的那一次计时，
+        # 因此同一个被装饰的函数在多个线程、多个任务中同时执行也不会互相干扰。
+        label = func.__name__
+        sampler = self._sampler
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                weight = 1 if sampler is None else sampler.take()
+                if not weight:
+                    return await func(*args, **kwargs)
+                run = self._push(label=label, weight=weight)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._pop(run)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                weight = 1 if sampler is None else sampler.take()
+                if not weight:
+                    return func(*args, **kwargs)
+                run = self._push(label=label, weight=weight)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._pop(run)
 
         return wrapper
 
     def __enter__(self):
-        self.start()
+        self._push()
         return self
 
     def __exit__(self, exc_type, exc_val, traceback):
         self.stop()
 
+    async def __aenter__(self):
+        self._push()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, traceback):
+        self.stop()
+
     @property
     def records(self) -> list[tuple[datetime, timedelta]]:
         """
         每一次记录的时刻，以及距上一次记录的时间差。
+
+        如需同时获取 CPU 时间和内存用量，请使用 :attr:`details` 。
+        """
+        return [(lap.time, lap.delta) for lap in self.details]
+
+    @property
+    def details(self) -> list[Lap]:
+        """
+        每一次记录的时刻、距上一次记录的时间差，以及（启用时）这期间的 CPU 时间和内存用量。
+
+        优先返回当前上下文中正在进行的计时；没有的话返回最近一次开始的计时，
+        多个线程共用计时器时，这可能是其它线程开始的计时。
+        """
+        run = self._find() or self._last
+        if run is None:
+            return []
+        offsets = run.offsets()
+        count = len(offsets)
+        cpus = [None] * count if run.cpus is None else run.ordered(run.cpus)
+        sizes = [None] * count if run.sizes is None else run.ordered(run.sizes)
+        peaks = [None] * count if run.peaks is None else run.ordered(run.peaks)
+        origin = datetime.fromtimestamp(run.epoch // 10 ** 9) + timedelta(microseconds=run.epoch % 10 ** 9 // 1000)
+        records = []
+        for i in range(count):
+            j = max(i - 1, 0)
+            records.append(Lap(
+                origin + timedelta(microseconds=offsets[i] // 1000),
+                timedelta(microseconds=(offsets[i] - offsets[j]) // 1000),
+                None if cpus[i] is None else timedelta(microseconds=(cpus[i] - cpus[j]) // 1000),
+                None if sizes[i] is None else sizes[i] - sizes[j],
+                None if peaks[i] is None else max(peaks[i] - sizes[j], 0),
+            ))
+        return records if run.size is None else records[1 - run.size:]
+
+    @property
+    def laps(self) -> int:
         """
-        return self._marks[:]
+        记录的次数，包括开始时的那一次。限定了容量时也包括已被丢弃的记录。
+        """
+        run = self._find() or self._last
+        return 0 if run is None else run.count
 
-    def _log(self, total: float, delta: float, msg=''):
-        logger.debug(f'[{self._label}] [{total:.9f} +{delta:.9f}]: {msg}')
+    @property
+    def elapsed(self) -> int:
+        """
+        开始时刻到最近一次记录之间的时间差，单位为纳秒。
+        """
+        run = self._find() or self._last
+        return 0 if run is None else run.prev - run.head
+
+    def _log(self, run: _Run, total: int, delta: int, msg='', usage: tuple = None):
+        # 交由 logging 在输出时才格式化，避免 Logger 被过滤时白白构造字符串。
+        if usage is None:
+            logger.debug('[%s] [%.9f +%.9f]: %s', run.label, total / 1e9, delta / 1e9, msg)
+            return
+        cpu, allocated, peak = usage
+        fmt = '[%s] [%.9f +%.9f]'
+        args = [run.label, total / 1e9, delta / 1e9]
+        if cpu is not None:
+            fmt += ' [cpu +%.9f]'
+            args.append(cpu / 1e9)
+        if allocated is not None:
+            fmt += ' [mem %+dB peak %dB]'
+            args.extend((allocated, peak))
+        logger.debug(fmt + ': %s', *args, msg)
+
+    def _usage(self) -> tuple[Optional[int], Optional[int], Optional[int]]:
+        cpu = None if self._cpu is None else self._cpu()
+        if not self._memory:
+            return cpu, None, None
+        size, peak = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return cpu, size, peak
+
+    def _find(self) -> Optional[_Run]:
+        run = _running.get()
+        while run is not None and run.timer() is not self:
+            run = run.parent
+        return run
+
+    def _push(self, msg='Starting...', label: str = None, weight: int | float = 1) -> _Run:
+        parent = _running.get()
+        while parent is not None and parent.timer() is None:
+            parent = parent.parent
+        run = _Run(self._ref, label or self._label, parent, self._capacity)
+        if self._cpu is None and not self._memory:
+            run.reset(time_ns(), self._clock(), None, None)
+        else:
+            if self._memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            cpu, size, _ = self._usage()
+            run.reset(time_ns(), self._clock(), cpu, size)
+        run.weight = weight
+        _running.set(run)
+        self._last = run
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(run, 0, 0, msg)
+        return run
+
+    def _pop(self, run: _Run, msg='Stopped.') -> int:
+        total, _ = self._mark(run, msg)
+        curr = _running.get()
+        if curr is run:
+            _running.set(run.parent)
+        else:
+            while curr is not None and curr.parent is not run:
+                curr = curr.parent
+            if curr is not None:
+                curr.parent = run.parent
+        if run.parent is not None:
+            run.parent.inner += total
+        if self._stats:
+            type(self).REGISTRY.record(run.label, total, run.weight)
+        tracer = type(self).TRACER
+        if tracer.enabled:
+            tracer._record(run, max(total - run.inner, 0))
+        return total
+
+    def _mark(self, run: _Run, msg: str) -> tuple[int, int]:
+        curr = self._clock()
+        total = curr - run.head
+        delta = curr - run.prev
+        # 热点路径，直接写入标记而不经过 _Run 的方法。
+        index = -1 if run.size is None or run.count < run.size else run.count % run.size
+        marks = run.marks
+        if marks is None and run.count > 1:
+            marks = run.marks = array('q', (0, run.prev - run.head))
+        if marks is None:
+            pass  # 第二个标记就是 prev - head ，无需保存
+        elif index < 0:
+            marks.append(total)
+        else:
+            marks[index] = total
+        usage = None
+        if run.cpus is not None or run.sizes is not None:
+            usage = self._track(run, index)
+        run.prev = curr
+        run.count += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(run, total, delta, msg, usage)
+        return total, delta
+
+    def _track(self, run: _Run, index: int) -> tuple[Optional[int], Optional[int], Optional[int]]:
+        cpu, size, peak = self._usage()
+        if cpu is not None:
+            offset = cpu - run.cpu_head
+            cpu = cpu - run.cpu_prev
+            run.cpu_prev += cpu
+            if index < 0:
+                run.cpus.append(offset)
+            else:
+                run.cpus[index] = offset
+        allocated = None
+        if size is not None:
+            last = run.sizes[(run.count - 1) % len(run.sizes)]
+            allocated = size - last
+            if index < 0:
+                run.sizes.append(size)
+                run.peaks.append(peak)
+            else:
+                run.sizes[index] = size
+                run.peaks[index] = peak
+            peak = max(peak - last, 0)
+        return cpu, allocated, peak
 
     def start(self, msg='Starting...'):
         """
@@ -178,39 +952,80 @@ class BearTimer:
         :param msg: 要输出的消息。
         :return: 当前秒表。
         """
-        self._marks = [(datetime.now(), timedelta())]
-        self._log(0, 0, msg)
+        run = self._find()
+        if run is None:
+            self._push(msg)
+            return self
+        cpu, size, _ = self._usage()
+        run.reset(time_ns(), self._clock(), cpu, size)
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log(run, 0, 0, msg)
         return self
 
-    def lap(self, msg='') -> tuple[datetime, datetime, datetime, timedelta, timedelta]:
+    def lap(self, msg='') -> tuple[int, int]:
         """
         记下当前的时刻。
 
         :param msg: 要输出的消息。
-        :return: 开始时刻、上次记录时刻、当前时刻、距开始时间、距上次时间。
-        """
-        with Lock():
-            if not self._marks:
-                self.start('Automatically start...')
+        :return: 距开始时间、距上次时间，单位均为纳秒。
 
-            head = self._marks[0][0]
-            prev = self._marks[-1][0]
-            curr = datetime.now()
-            total = curr - head
-            delta = curr - prev
-            self._log(total.total_seconds(), delta.total_seconds(), msg)
-            self._marks.append((curr, delta))
-            return head, prev, curr, total, delta
-
-    def stop(self, msg='Stopped.') -> datetime:
+        .. versionchanged:: 0.5.0
+           此前返回开始时刻、上次记录时刻、当前时刻、距开始时间、距上次时间，均为日期时间对象。
+           如需日期时间形式的记录，请使用 :attr:`records` 。
+        """
+        # 热点路径，内联 self._find() 以减少一次函数调用。
+        run = _running.get()
+        while run is not None and run.timer() is not self:
+            run = run.parent
+        if run is None:
+            run = self._push('Automatically start...')
+        return self._mark(run, msg)
+
+    def stop(self, msg='Stopped.') -> int:
         """
         停止计时，但不清除所有标记。
 
         :param msg: 要输出的消息。
-        :return: 当前时刻。
+        :return: 距开始时间，单位为纳秒。
+
+        .. versionchanged:: 0.5.0
+           此前返回停止时的时刻（:class:`datetime`），现在可以从 :attr:`records` 的最后一项中获取。
         """
-        _, _, curr, _, _ = self.lap(msg)
-        return curr
+        run = self._find()
+        if run is None:
+            run = self._push('Automatically start...')
+        return self._pop(run, msg)
+
+
+def _fromcalendar(year: int, week: int, day: int, sunday_first: bool) -> int:
+    """
+    计算某一年第几周的星期几是哪一天，返回其 :meth:`序数 <date.toordinal>` 。
+    结果与 ``strptime()`` 的 ``%Y-%W-%w`` 和 ``%Y-%U-%w`` 完全一致，只是不经过字符串。
+    """
+    if not 0 <= week <= 53:
+        raise ValueError(f'周数 {week} 超出了 0~53 的范围。')
+    if not 0 <= day <= 6:
+        raise ValueError(f'星期 {day} 超出了 0~6 的范围。')
+    first = date(year, 1, 1).toordinal()
+    # 元旦、目标日期分别是一周中的第几天，从 0 开始
+    offset = first % 7 if sunday_first else (first - 1) % 7
+    weekday = day if sunday_first else (day + 6) % 7
+    if week == 0:
+        return first + weekday - offset
+    return first + (7 - offset) % 7 + (week - 1) * 7 + weekday
+
+
+def _fromisocalendar(year: int, week: int) -> int:
+    """
+    计算 ISO 8601 中某一年第几周的周一是哪一天，返回其 :meth:`序数 <date.toordinal>` 。
+    """
+    # 每年的 1 月 4 日总在第 1 周
+    fourth = date(year, 1, 4).toordinal()
+    monday = fourth - (fourth - 1) % 7
+    weeks = 53 if (monday + 52 * 7) <= date(year, 12, 28).toordinal() else 52
+    if not 1 <= week <= weeks:
+        raise ValueError(f'{year} 年的周数 {week} 超出了 1~{weeks} 的范围。')
+    return monday + (week - 1) * 7
 
 
 def is_leap(year: int) -> bool:
@@ -239,6 +1054,105 @@ class TimeFrame(IntEnum):
     MICROSECOND = 6
 
 
+# 可以按固定宽度处理的格式指令：在参数中的位置、宽度
+_DIRECTIVES = {
+    'Y': (0, 4),
+    'm': (1, 2),
+    'd': (2, 2),
+    'H': (3, 2),
+    'M': (4, 2),
+    'S': (5, 2),
+    'f': (6, 6),
+    'y': (7, 2),
+}
+
+
+def _tokenize(fmt: str) -> Optional[list[tuple[str, str]]]:
+    """
+    将格式拆分为 ``(指令, 原文)`` 序列，普通文字的指令为空字符串。含有不支持的指令时返回 ``None`` 。
+    """
+    tokens = []
+    i = 0
+    while i < len(fmt):
+        if fmt[i] != '%':
+            j = fmt.find('%', i)
+            j = len(fmt) if j < 0 else j
+            tokens.append(('', fmt[i:j]))
+            i = j
+            continue
+        directive = fmt[i + 1:i + 2]
+        if directive == '%':
+            tokens.append(('', '%'))
+        elif directive in _DIRECTIVES:
+            tokens.append((directive, fmt[i:i + 2]))
+        else:
+            return None
+        i += 2
+    return tokens
+
+
+@lru_cache(maxsize=128)
+def _compile_parser(fmt: str) -> Optional[Callable[[str], Optional[list[int]]]]:
+    """
+    将格式编译为解析函数，该函数返回 :class:`datetime` 的构造参数，无法处理时返回 ``None`` 。
+    每个指令都按固定宽度的 ASCII 数字匹配，整个格式编译为一个正则表达式，与解析函数一起缓存。
+    格式含有不支持的指令时返回 ``None`` 。
+    """
+    tokens = _tokenize(fmt)
+    if tokens is None:
+        return None
+    directives = [directive for directive, _ in tokens if directive]
+    # 重复的指令交给 strptime() 报错；%Y 与 %y 同时出现时以后者为准，也交给 strptime() 处理。
+    if len(set(directives)) != len(directives) or {'Y', 'y'} <= set(directives):
+        return None
+
+    pattern = re.compile(''.join(
+        f'([0-9]{{{_DIRECTIVES[directive][1]}}})' if directive else re.escape(text)
+        for directive, text in tokens
+    )).fullmatch
+    targets = [_DIRECTIVES[directive][0] for directive in directives]
+    defaults = [1900, 1, 1, 0, 0, 0, 0]
+
+    if targets == list(range(len(targets))):
+        tail = defaults[len(targets):]
+
+        def parse(text: str) -> Optional[list[int]]:
+            match = pattern(text)
+            return None if match is None else [*map(int, match.groups()), *tail]
+
+        return parse
+
+    def parse(text: str) -> Optional[list[int]]:
+        match = pattern(text)
+        if match is None:
+            return None
+        args = defaults + [None]
+        for index, value in zip(targets, map(int, match.groups())):
+            args[index] = value
+        year = args.pop()
+        if year is not None:
+            args[0] = year + (2000 if year < 69 else 1900)
+        return args
+
+    return parse
+
+
+@lru_cache(maxsize=128)
+def _compile_formatter(fmt: str) -> Optional[str]:
+    """
+    将格式编译为 :meth:`str.format` 的模板，参数依次为年、月、日、时、分、秒、微秒、两位年份。
+    格式含有不支持的指令时返回 ``None`` 。
+    """
+    tokens = _tokenize(fmt)
+    if tokens is None:
+        return None
+    return ''.join(
+        f'{{{_DIRECTIVES[directive][0]}:0{_DIRECTIVES[directive][1]}d}}' if directive
+        else text.replace('{', '{{').replace('}', '}}')
+        for directive, text in tokens
+    )
+
+
 class Datetime(datetime):
     """
     增强型日期时间对象。
@@ -262,10 +1176,7 @@ class Datetime(datetime):
         :param sunday_first: 是否将周日作为一周的开始。
         :return: 一个具体的日期。
         """
-        return cls.strptime(
-            f'{year:04d}-{week:02d}-{day:1d}',
-            '%Y-%U-%w' if sunday_first else '%Y-%W-%w',
-        )
+        return cls.fromordinal(_fromcalendar(year, week, day, sunday_first))
 
     @classmethod
     def fromdatetime(cls, _datetime: datetime) -> Datetime:
@@ -280,8 +1191,85 @@ class Datetime(datetime):
 
     of = fromdatetime
 
+    @classmethod
+    def parse(cls, text: str, fmt: Optional[str] = None) -> Datetime:
+        """
+        将字符串解析为日期时间。
+
+        - 不提供 *fmt* 时按 ISO 8601 解析，与 :meth:`datetime.fromisoformat` 相同；
+        - 提供 *fmt* 时结果与 :meth:`datetime.strptime` 相同。只含有 ``%Y %m %d %H %M %S %f %y %%`` 的格式
+          会被编译成按固定宽度匹配的正则表达式并缓存起来，之后只需匹配一次、转换几个整数，
+          而不必像 :meth:`datetime.strptime` 那样每次都经过 :mod:`_strptime` 的通用逻辑。
+          宽度对不上或含有其它指令时仍然交给 :meth:`datetime.strptime` 处理。
+
+        >>> Datetime.parse('2024-09-17 11:22:33', '%Y-%m-%d %H:%M:%S')
+        Datetime(2024, 9, 17, 11, 22, 33)
+
+        :param text: 日期时间字符串。
+        :param fmt: 格式。
+        :return: 日期时间对象。
+        :raise ValueError: 字符串与格式不匹配。
+        """
+        if fmt is None:
+            return cls.fromisoformat(text)
+        parse = _compile_parser(fmt)
+        args = None if parse is None else parse(text)
+        if args is not None:
+            try:
+                return cls(*args)
+            except ValueError:
+                pass
+        return cls.strptime(text, fmt)
+
+    @classmethod
+    def parse_many(cls, texts: Iterable[str], fmt: Optional[str] = None) -> Generator[Datetime, None, None]:
+        """
+        逐个解析字符串，与对每个字符串调用 :meth:`parse` 相同，但格式只查找一次。
+
+        >>> list(Datetime.parse_many(['2024-09-17', '2024-09-18'], '%Y-%m-%d'))
+        [Datetime(2024, 9, 17, 0, 0), Datetime(2024, 9, 18, 0, 0)]
+        """
+        if fmt is None:
+            yield from map(cls.fromisoformat, texts)
+            return
+        parse = _compile_parser(fmt)
+        if parse is None:
+            for text in texts:
+                yield cls.strptime(text, fmt)
+            return
+        for text in texts:
+            args = parse(text)
+            if args is not None:
+                try:
+                    yield cls(*args)
+                    continue
+                except ValueError:
+                    pass
+            yield cls.strptime(text, fmt)
+
     # ---- 转换器 ----
 
+    def format(self, fmt: Optional[str] = None) -> str:
+        """
+        将日期时间格式化为字符串。
+
+        - 不提供 *fmt* 时与 :meth:`datetime.isoformat` 相同；
+        - 提供 *fmt* 时结果与 :meth:`datetime.strftime` 相同，但只含有 ``%Y %m %d %H %M %S %f %y %%``
+          的格式会编译为 :meth:`str.format` 的模板。
+
+        >>> Datetime(2024, 9, 17, 11, 22, 33).format('%Y/%m/%d %H:%M')
+        '2024/09/17 11:22'
+        """
+        if fmt is None:
+            return self.isoformat()
+        template = _compile_formatter(fmt)
+        # 不足四位的年份在不同平台上的补零方式不一样，交给 strftime() 处理。
+        if template is None or self.year < 1000:
+            return self.strftime(fmt)
+        return template.format(
+            self.year, self.month, self.day, self.hour, self.minute, self.second, self.microsecond, self.year % 100,
+        )
+
     def replace(
             self,
             year: Optional[int] = None,
@@ -482,7 +1470,10 @@ class Datetime(datetime):
         :param sunday_first: 是否将周日作为一周的开始。
         :return: 一个三元组，分别表示哪一、哪一周、周几。
         """
-        return tuple(map(int, self.strftime('%Y-%U-%w' if sunday_first else '%Y-%W-%w').split('-')))
+        weekday = self.weekday()
+        yday = self.toordinal() - date(self.year, 1, 1).toordinal()
+        day = (weekday + 1) % 7
+        return self.year, (yday + 7 - (day if sunday_first else weekday)) // 7, day
 
     # ---- 判断 ----
 
@@ -573,35 +1564,1533 @@ class Timedelta(timedelta):
         )
 
 
-def daterange(start: date, stop: date, step: int = 1, closed=False) -> Generator[date, None, None]:
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MAX_ORDINAL = date.max.toordinal()
+_DATETIME_EPOCH = Datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_US_PER_DAY = 86400_000000
+_US_PER_FRAME = {
+    TimeFrame.DAY: _US_PER_DAY,
+    TimeFrame.HOUR: 3600_000000,
+    TimeFrame.MINUTE: 60_000000,
+    TimeFrame.SECOND: 1_000000,
+}
+_NUMPY_UNITS = {
+    TimeFrame.YEAR: 'Y',
+    TimeFrame.MONTH: 'M',
+    TimeFrame.DAY: 'D',
+    TimeFrame.HOUR: 'h',
+    TimeFrame.MINUTE: 'm',
+    TimeFrame.SECOND: 's',
+}
+
+
+def _utc_naive(moment: datetime) -> datetime:
+    """
+    将带时区的时刻转换为不带时区的 UTC 时刻。
+
+    :meth:`Datetime.replace` 的参数与 :meth:`datetime.replace` 不同，因此总是调用后者，
+    使 :class:`Datetime` 和 :class:`datetime` 都能正确转换。
+    """
+    return datetime.replace(moment.astimezone(timezone.utc), tzinfo=None)
+
+
+def _as_datetime(moment: datetime) -> Datetime:
+    # Python 3.8 以前，datetime 子类与 timedelta 相加减得到的是 datetime ，须显式转换
+    return moment if type(moment) is Datetime else Datetime.fromdatetime(moment)
+
+
+def _datetime_at(micros: int) -> Datetime:
+    return _as_datetime(_DATETIME_EPOCH + timedelta(microseconds=micros))
+
+
+def _fromnumpy(values) -> array:
+    result = array('q')
+    result.frombytes(values.astype('int64').tobytes())
+    return result
+
+
+class DatetimeArray(Sequence):
+    """
+    列式存储的日期时间数组。
+
+    每个日期时间以自 1970-01-01 00:00:00 起的微秒数保存在 :class:`array.array` 中，每个只占 8 字节；
+    :meth:`empty` 、:meth:`fill` 、:meth:`calendar` 直接对整数批量计算，只有在访问元素时才构造 :class:`Datetime` 对象。
+    安装了 NumPy 时会改用 ``datetime64`` 计算。
+
+    >>> column = DatetimeArray(Datetime(2024, 9, d, 11, 22, 33) for d in range(1, 31))
+    >>> column.empty(TimeFrame.MONTH)[0]
+    Datetime(2024, 9, 1, 0, 0)
+    >>> years, weeks, days = column.calendar()
+
+    带时区的日期时间会先转换为 UTC ，之后按不带时区的日期时间保存。
+    """
+    __slots__ = ('_values',)
+
+    def __init__(self, datetimes: Iterable[datetime] = ()):
+        """
+        :param datetimes: 任意个 :class:`datetime` 对象。
+        """
+        self._values = array('q', [
+            ((dt if dt.tzinfo is None else _utc_naive(dt)) - _EPOCH) // _US
+            for dt in datetimes
+        ])
+
+    @classmethod
+    def frommicroseconds(cls, values: Iterable[int]) -> DatetimeArray:
+        """
+        用自 1970-01-01 00:00:00 起的微秒数构造数组。
+        """
+        self = cls.__new__(cls)
+        self._values = values if isinstance(values, array) and values.typecode == 'q' else array('q', values)
+        return self
+
+    @classmethod
+    def fromnumpy(cls, values) -> DatetimeArray:
+        """
+        用 NumPy 的 ``datetime64`` 数组构造数组。
+        """
+        return cls.frommicroseconds(_fromnumpy(values.astype('datetime64[us]')))
+
+    def tonumpy(self):
+        """
+        转换为 NumPy 的 ``datetime64[us]`` 数组。两者共享内存，不会复制数据。
+        """
+        if numpy is None:
+            raise ImportError('需要安装 NumPy 。')
+        return numpy.frombuffer(self._values, dtype='datetime64[us]')
+
+    @property
+    def values(self) -> array:
+        """
+        自 1970-01-01 00:00:00 起的微秒数。
+        """
+        return self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: int | slice) -> Datetime | DatetimeArray:
+        if isinstance(index, slice):
+            return self.frommicroseconds(self._values[index])
+        return _datetime_at(self._values[index])
+
+    def __iter__(self) -> Iterator[Datetime]:
+        return map(_datetime_at, self._values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DatetimeArray):
+            return self._values == other._values
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}.frommicroseconds({self._values!r})'
+
+    def empty(self, keeping_level: TimeFrame = TimeFrame.DAY) -> DatetimeArray:
+        """
+        将每个日期时间某个层级以下（不含）的部分归零，与 :meth:`Datetime.empty` 相同。
+        """
+        values = self._values
+        if keeping_level == TimeFrame.MICROSECOND:
+            return self.frommicroseconds(values[:])
+        if numpy is not None:
+            result = self.tonumpy().astype(f'datetime64[{_NUMPY_UNITS[keeping_level]}]').astype('datetime64[us]')
+            return self.frommicroseconds(_fromnumpy(result))
+        if keeping_level in _US_PER_FRAME:
+            unit = _US_PER_FRAME[keeping_level]
+            return self.frommicroseconds(array('q', [v - v % unit for v in values]))
+
+        starts = {}
+        result = array('q', values)
+        for i, v in enumerate(values):
+            days = v // _US_PER_DAY
+            start = starts.get(days)
+            if start is None:
+                day = date.fromordinal(days + _EPOCH_ORDINAL)
+                if keeping_level == TimeFrame.MONTH:
+                    start = days - day.day + 1
+                else:
+                    start = date(day.year, 1, 1).toordinal() - _EPOCH_ORDINAL
+                start = starts[days] = start * _US_PER_DAY
+            result[i] = start
+        return self.frommicroseconds(result)
+
+    def fill(self, keeping_level: TimeFrame = TimeFrame.DAY) -> DatetimeArray:
+        """
+        将每个日期时间某个层级以下（不含）的部分填满，与 :meth:`Datetime.fill` 相同。
+        """
+        values = self._values
+        if keeping_level == TimeFrame.MICROSECOND:
+            return self.frommicroseconds(values[:])
+        if numpy is not None:
+            unit = f'datetime64[{_NUMPY_UNITS[keeping_level]}]'
+            result = (self.tonumpy().astype(unit) + 1).astype('datetime64[us]') - numpy.timedelta64(1, 'us')
+            return self.frommicroseconds(_fromnumpy(result))
+        if keeping_level in _US_PER_FRAME:
+            unit = _US_PER_FRAME[keeping_level]
+            return self.frommicroseconds(array('q', [v - v % unit + unit - 1 for v in values]))
+
+        stops = {}
+        result = array('q', values)
+        for i, v in enumerate(values):
+            days = v // _US_PER_DAY
+            stop = stops.get(days)
+            if stop is None:
+                day = date.fromordinal(days + _EPOCH_ORDINAL)
+                if keeping_level == TimeFrame.MONTH:
+                    stop = days - day.day + 1 + get_last_monthday(day.year, day.month)
+                else:
+                    stop = date(day.year, 12, 31).toordinal() - _EPOCH_ORDINAL + 1
+                stop = stops[days] = stop * _US_PER_DAY - 1
+            result[i] = stop
+        return self.frommicroseconds(result)
+
+    def calendar(self, sunday_first=False) -> tuple[array, array, array]:
+        """
+        计算每个日期是哪一年哪一周的周几，与 :meth:`Datetime.calendar` 相同。
+
+        :param sunday_first: 是否将周日作为一周的开始。
+        :return: 三个数组，分别表示哪一年、哪一周、周几。
+        """
+        if numpy is not None:
+            values = self.tonumpy()
+            days = values.astype('datetime64[D]').view('int64')
+            years = values.astype('datetime64[Y]')
+            yday = days - years.astype('datetime64[D]').view('int64')
+            weekday = (days + 3) % 7  # 1970-01-01 是周四
+            day = (weekday + 1) % 7
+            week = (yday + 7 - (day if sunday_first else weekday)) // 7
+            return _fromnumpy(years.view('int64') + 1970), _fromnumpy(week), _fromnumpy(day)
+
+        years, weeks, weekdays = array('q'), array('q'), array('q')
+        calendars = {}
+        last, calendar = None, None
+        for v in self._values:
+            days = v // _US_PER_DAY
+            if days != last:
+                calendar = calendars.get(days)
+                if calendar is None:
+                    ordinal = days + _EPOCH_ORDINAL
+                    year = date.fromordinal(ordinal).year
+                    weekday = (ordinal - 1) % 7
+                    day = ordinal % 7
+                    yday = ordinal - date(year, 1, 1).toordinal()
+                    calendar = calendars[days] = year, (yday + 7 - (day if sunday_first else weekday)) // 7, day
+                last = days
+            years.append(calendar[0])
+            weeks.append(calendar[1])
+            weekdays.append(calendar[2])
+        return years, weeks, weekdays
+
+
+class Bucket(NamedTuple):
+    """
+    一个时间段内的汇总。
+    """
+    start: datetime
+    """时间段的开始（包含）。"""
+    stop: datetime
+    """时间段的结束（不包含）。"""
+    count: int
+    """数值的个数。"""
+    total: int | float
+    """数值的总和。"""
+    min: int | float
+    """最小值。"""
+    max: int | float
+    """最大值。"""
+
+    @property
+    def mean(self) -> float:
+        """
+        平均值。
+        """
+        return self.total / self.count
+
+
+def bucketize(
+        pairs: Iterable[tuple[datetime, int | float]],
+        keeping_level: TimeFrame = TimeFrame.HOUR,
+        offset: timedelta = timedelta(),
+) -> Generator[Bucket, None, None]:
+    """
+    按时间段流式汇总 ``(时刻, 数值)`` 序列。
+
+    时间段的划分与 :meth:`Datetime.empty` 相同，每当遇到下一个时间段的时刻，就产出上一个时间段的汇总，
+    因此无论输入有多长，都只占用一个时间段的内存。没有任何数值的时间段不会产出。
+
+    >>> events = [(Datetime(2024, 9, 17, 3, 0), 1), (Datetime(2024, 9, 17, 5, 0), 2), (Datetime(2024, 9, 18, 1, 0), 3)]
+    >>> for bucket in bucketize(events, TimeFrame.DAY, offset=timedelta(hours=4)):
+    >>>     print(bucket.start, bucket.count, bucket.total)
+    2024-09-16 04:00:00 1 1
+    2024-09-17 04:00:00 2 5
+
+    :param pairs: 按时间升序排列的 ``(时刻, 数值)`` 序列。
+    :param keeping_level: 按哪个层级划分时间段。
+    :param offset: 时间段开始时刻的偏移量。比如按天汇总时，``timedelta(hours=4)`` 表示每天从凌晨四点开始。
+    :return: 按时间升序产出每个时间段的汇总。
+    :raise ValueError: 输入没有按时间升序排列。
+    """
+    start = stop = None
+    count = total = low = high = 0
+    for moment, value in pairs:
+        if stop is None or not start <= moment < stop:
+            if stop is not None:
+                if moment < start:
+                    raise ValueError(f'时刻 {moment} 早于当前时间段 {start} ，输入须按时间升序排列。')
+                yield Bucket(start, stop, count, total, low, high)
+            shifted = Datetime.of(moment - offset)
+            start = _as_datetime(shifted.empty(keeping_level) + offset)
+            stop = _as_datetime(shifted.fill(keeping_level) + _US + offset)
+            count, total, low, high = 1, value, value, value
+            continue
+        count += 1
+        total += value
+        if value < low:
+            low = value
+        elif value > high:
+            high = value
+    if stop is not None:
+        yield Bucket(start, stop, count, total, low, high)
+
+
+def _solve(a: int, m: int, b: int, n: int) -> Optional[int]:
+    """
+    求满足 x ≡ a (mod m) 且 x ≡ b (mod n) 的最小非负整数 x ，无解时返回 ``None`` 。
+    """
+    # 扩展欧几里得算法：g = m * u + n * v
+    old_r, r, old_u, u = m, n, 1, 0
+    while r:
+        q = old_r // r
+        old_r, r = r, old_r - q * r
+        old_u, u = u, old_u - q * u
+    g = old_r
+    if (b - a) % g:
+        return None
+    lcm = m // g * n
+    return (a + (b - a) // g * old_u % (n // g) * m) % lcm
+
+
+class DateRange(Sequence):
+    """
+    日期范围。
+
+    与 :class:`range` 一样按需计算，不会生成所有日期，因此长度、下标、切片、成员判断都是常数时间，
+    也可以反复迭代。
+
+    >>> days = DateRange(date(2024, 1, 1), date(2025, 1, 1))
+    >>> len(days)
+    366
+    >>> days[-1]
+    datetime.date(2024, 12, 31)
+    >>> date(2024, 2, 29) in days
+    True
+    >>> days[::7]
+    DateRange(datetime.date(2024, 1, 1), datetime.date(2025, 1, 1), 7)
+    """
+    __slots__ = ('_ordinals',)
+
+    def __init__(self, start: date, stop: date, step: int = 1, closed=False):
+        """
+        :param start: 开始日期。
+        :param stop: 结束日期。
+        :param step: 步长。提供负数时，请确保开始日期晚于（即大于）结束日期。如果为 ``0`` 会引发 :class:`ValueError` 。
+        :param closed: 结束日期是否可以到达。
+        """
+        end = stop.toordinal()
+        if closed:
+            end += 1 if step > 0 else -1
+        self._ordinals = range(start.toordinal(), end, step)
+
+    @classmethod
+    def _of(cls, ordinals: range) -> DateRange:
+        self = cls.__new__(cls)
+        self._ordinals = ordinals
+        return self
+
+    @property
+    def start(self) -> date:
+        """
+        开始日期。
+        """
+        return date.fromordinal(self._ordinals.start)
+
+    @property
+    def stop(self) -> Optional[date]:
+        """
+        结束日期（不包含）。
+
+        包含端点的范围到达 :attr:`date.min` 或 :attr:`date.max` 时，不包含的结束日期已超出 :class:`date` 的表示范围，
+        此时为 ``None`` 。
+        """
+        stop = self._ordinals.stop
+        if not 1 <= stop <= _MAX_ORDINAL:
+            return None
+        return date.fromordinal(stop)
+
+    @property
+    def step(self) -> int:
+        """
+        步长（天）。
+        """
+        return self._ordinals.step
+
+    @property
+    def ordinals(self) -> range:
+        """
+        所有日期的 :meth:`序数 <date.toordinal>` 。
+        """
+        return self._ordinals
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def __bool__(self) -> bool:
+        return bool(self._ordinals)
+
+    def __getitem__(self, index: int | slice) -> date | DateRange:
+        if isinstance(index, slice):
+            return self._of(self._ordinals[index])
+        return date.fromordinal(self._ordinals[index])
+
+    def __iter__(self) -> Iterator[date]:
+        return map(date.fromordinal, self._ordinals)
+
+    def __reversed__(self) -> Iterator[date]:
+        return map(date.fromordinal, reversed(self._ordinals))
+
+    def __contains__(self, value) -> bool:
+        # datetime 是 date 的子类，但二者并不相等。
+        if not isinstance(value, date) or isinstance(value, datetime):
+            return False
+        return value.toordinal() in self._ordinals
+
+    def index(self, value: date, *_) -> int:
+        if value not in self:
+            raise ValueError(f'{value!r} 不在日期范围内。')
+        return self._ordinals.index(value.toordinal())
+
+    def count(self, value: date) -> int:
+        return int(value in self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DateRange):
+            return self._ordinals == other._ordinals
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._ordinals)
+
+    def __repr__(self) -> str:
+        r = self._ordinals
+        step = '' if r.step == 1 else f', {r.step}'
+        try:
+            start, stop = self.start, self.stop
+        except (ValueError, OverflowError):
+            stop = None
+        if stop is None:
+            return f'{type(self).__name__}({r!r})'
+        return f'{type(self).__name__}({start!r}, {stop!r}{step})'
+
+    def intersection(self, other: DateRange) -> DateRange:
+        """
+        求两个日期范围的交集，方向与当前日期范围相同。
+
+        >>> mondays = DateRange(date(2024, 1, 1), date(2025, 1, 1), 7)
+        >>> march = DateRange(date(2024, 3, 1), date(2024, 4, 1))
+        >>> list(mondays & march)
+        [datetime.date(2024, 3, 4), datetime.date(2024, 3, 11), datetime.date(2024, 3, 18), datetime.date(2024, 3, 25)]
+        """
+        a, b = self._ordinals, other._ordinals
+        if a.step < 0:
+            a = a[::-1]
+        if b.step < 0:
+            b = b[::-1]
+        result = range(0)
+        if a and b:
+            low, high = max(a[0], b[0]), min(a[-1], b[-1])
+            first = _solve(a[0], a.step, b[0], b.step)
+            if first is not None:
+                lcm = a.step * b.step // gcd(a.step, b.step)
+                first += -((first - low) // lcm) * lcm  # 不小于 low 的第一个解
+                result = range(first, high + 1, lcm)
+        if not result:
+            result = range(a.start, a.start) if a else a
+        return self._of(result if self._ordinals.step > 0 else result[::-1])
+
+    __and__ = intersection
+
+
+def daterange(start: date, stop: date, step: int = 1, closed=False) -> DateRange:
     """
     在一个日期范围内，按指定的步长迭代生成 :class:`date` 对象。
 
     :param start: 开始日期。
     :param stop: 结束日期。
-    :param step: 步长。提供负数时，请确保开始日期晚于（即大于）结束日期。如果为 ``0`` 会引发 :class:`datetime` 。
+    :param step: 步长。提供负数时，请确保开始日期晚于（即大于）结束日期。如果为 ``0`` 会引发 :class:`ValueError` 。
     :param closed: 结束日期是否可以到达。
-    :return: 生成 :class:`date` 对象的生成器。
+    :return: 可以反复迭代的 :class:`DateRange` 对象。
     """
-    if closed:
-        ordinals = range(start.toordinal(), stop.toordinal() + step, step)
-    else:
-        ordinals = range(start.toordinal(), stop.toordinal(), step)
+    return DateRange(start, stop, step, closed)
 
-    return (date.fromordinal(o) for o in ordinals)
 
-
-def weekrange(year: int, week: int, sunday_first=False) -> Generator[date, None, None]:
+def weekrange(year: int, week: int, sunday_first=False, iso=False) -> DateRange:
     """
-    枚举生成某一周的所有日期。
+    枚举某一周的所有日期。
 
     :param year: 具体年份。比如 2012、2023 等。
-    :param week: 一年中的第几周。从 ``0`` 开始。
+    :param week: 一年中的第几周。从 ``0`` 开始；``iso=True`` 时从 ``1`` 开始。
     :param sunday_first: 是否以周日为一周的开始。
-    :return: 生成 :class:`date` 对象的生成器。
+    :param iso: 是否按 ISO 8601 计算周数，此时总是以周一为一周的开始，
+                且每年的第 ``1`` 周是包含 1 月 4 日的那一周。
+    :return: 七天的 :class:`DateRange` 对象。
+    """
+    if iso:
+        start = _fromisocalendar(year, week)
+    else:
+        start = _fromcalendar(year, week, 0 if sunday_first else 1, sunday_first)
+    return DateRange._of(range(start, start + 7))
+
+
+_FRAME_STEPS = {
+    TimeFrame.DAY: timedelta(days=1),
+    TimeFrame.HOUR: timedelta(hours=1),
+    TimeFrame.MINUTE: timedelta(minutes=1),
+    TimeFrame.SECOND: timedelta(seconds=1),
+    TimeFrame.MICROSECOND: timedelta(microseconds=1),
+}
+
+
+def _shift_months(moment: datetime, months: int) -> Datetime:
+    """
+    将日期时间移动若干个月，日子超过当月最后一天时取当月最后一天。
     """
-    start = datetime.strptime(
-        f'{year:04d}-{week:02d}-{0 if sunday_first else 1}',
-        '%Y-%U-%w' if sunday_first else '%Y-%W-%w',
-    ).date()
-    return (start + timedelta(days=i) for i in range(7))
+    year, month = divmod(moment.year * 12 + moment.month - 1 + months, 12)
+    month += 1
+    return Datetime(
+        year, month, min(moment.day, get_last_monthday(year, month)),
+        moment.hour, moment.minute, moment.second, moment.microsecond, moment.tzinfo, fold=moment.fold,
+    )
+
+
+class DatetimeRange(Sequence):
+    """
+    按任意 :class:`TimeFrame` 单位步进的日期时间范围。
+
+    第 k 个元素总是由开始时刻直接推算，因此长度、下标、切片、成员判断都是常数时间。
+    按月或按年步进时，日子超过当月最后一天的取当月最后一天，比如每个季度末：
+
+    >>> quarters = DatetimeRange(Datetime(2024, 3, 31), Datetime(2025, 1, 1), 3, TimeFrame.MONTH)
+    >>> list(quarters)
+    [Datetime(2024, 3, 31, 0, 0), Datetime(2024, 6, 30, 0, 0), Datetime(2024, 9, 30, 0, 0), Datetime(2024, 12, 31, 0, 0)]
+
+    :meth:`buckets` 可以得到每一段的开始和结束，方便用于数据库的范围查询：
+
+    >>> months = DatetimeRange(Datetime(2024, 1, 1), Datetime(2024, 4, 1), frame=TimeFrame.MONTH)
+    >>> for start, end in months.buckets():
+    >>>     Order.objects.filter(created_at__range=(start, end))
+    """
+    __slots__ = ('_start', '_frame', '_step', '_indices')
+
+    def __init__(
+            self,
+            start: datetime,
+            stop: datetime,
+            step: int = 1,
+            frame: TimeFrame = TimeFrame.DAY,
+            closed=False,
+    ):
+        """
+        :param start: 开始时刻。
+        :param stop: 结束时刻。
+        :param step: 步长，即多少个 *frame* 单位。提供负数时，请确保开始时刻晚于（即大于）结束时刻。
+        :param frame: 步长的单位。
+        :param closed: 结束时刻是否可以到达。
+        :raise ValueError: 步长为 ``0`` 。
+        """
+        if step == 0:
+            raise ValueError('步长不能为 0 。')
+        self._start = Datetime.of(start)
+        self._frame = frame
+        self._step = step
+        if frame in _FRAME_STEPS:
+            distance = (stop - start) // _US
+            unit = _FRAME_STEPS[frame] * step // _US
+            size = distance // unit + 1 if closed and distance % unit == 0 else -(-distance // unit)
+        else:
+            months = (stop.year - start.year) * 12 + stop.month - start.month
+            size = max(0, -(-months // self._months))
+
+            def within(k: int) -> bool:
+                moment = self._at(k)
+                if closed and moment == stop:
+                    return True
+                return moment < stop if step > 0 else moment > stop
+
+            while size > 0 and not within(size - 1):
+                size -= 1
+            while within(size):
+                size += 1
+        self._indices = range(max(size, 0))
+
+    @property
+    def _months(self) -> int:
+        return self._step * 12 if self._frame == TimeFrame.YEAR else self._step
+
+    @classmethod
+    def _of(cls, start: Datetime, frame: TimeFrame, step: int, indices: range) -> DatetimeRange:
+        self = cls.__new__(cls)
+        self._start, self._frame, self._step, self._indices = start, frame, step, indices
+        return self
+
+    def _at(self, k: int) -> Datetime:
+        if self._frame in _FRAME_STEPS:
+            return _as_datetime(self._start + _FRAME_STEPS[self._frame] * (self._step * k))
+        return _shift_months(self._start, self._months * k)
+
+    @property
+    def start(self) -> Datetime:
+        """
+        开始时刻，即切片后的第一个元素，与 :attr:`DateRange.start` 和 :class:`range` 相同。
+        """
+        return self._at(self._indices.start)
+
+    @property
+    def frame(self) -> TimeFrame:
+        """
+        步长的单位。
+        """
+        return self._frame
+
+    @property
+    def step(self) -> int:
+        """
+        相邻两个元素之间相差多少个 :attr:`frame` 单位。
+        """
+        return self._step * self._indices.step
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __bool__(self) -> bool:
+        return bool(self._indices)
+
+    def __getitem__(self, index: int | slice) -> Datetime | DatetimeRange:
+        if isinstance(index, slice):
+            return self._of(self._start, self._frame, self._step, self._indices[index])
+        return self._at(self._indices[index])
+
+    def __iter__(self) -> Iterator[Datetime]:
+        return map(self._at, self._indices)
+
+    def __reversed__(self) -> Iterator[Datetime]:
+        return map(self._at, reversed(self._indices))
+
+    def _index(self, value) -> Optional[int]:
+        if not isinstance(value, datetime):
+            return None
+        if self._frame in _FRAME_STEPS:
+            k, remainder = divmod((value - self._start) // _US, _FRAME_STEPS[self._frame] * self._step // _US)
+            if remainder:
+                return None
+        else:
+            months = (value.year - self._start.year) * 12 + value.month - self._start.month
+            k, remainder = divmod(months, self._months)
+            if remainder or self._at(k) != value:
+                return None
+        return k if k in self._indices else None
+
+    def __contains__(self, value) -> bool:
+        return self._index(value) is not None
+
+    def index(self, value: datetime, *_) -> int:
+        k = self._index(value)
+        if k is None:
+            raise ValueError(f'{value!r} 不在日期时间范围内。')
+        return self._indices.index(k)
+
+    def count(self, value: datetime) -> int:
+        return int(value in self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DatetimeRange):
+            return len(self) == len(other) and all(map(datetime.__eq__, self, other))
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((len(self), self[0], self[-1]) if self else 0)
+
+    def __repr__(self) -> str:
+        indices = self._indices
+        if indices and indices.start and self._frame not in _FRAME_STEPS and self._start.day > 28:
+            # 按月推算时会取当月最后一天，以切片后的第一个元素重新推算会得到不同的日子，
+            # 因此保留原先的开始时刻，再写出切片
+            top = max(indices[0], indices[-1]) + 1
+            stop = '' if indices.stop < 0 else indices.stop
+            step = '' if indices.step == 1 else f':{indices.step}'
+            return (f'{type(self).__name__}({self._start!r}, {self._at(top)!r}, '
+                    f'{self._step}, TimeFrame.{self._frame.name})[{indices.start}:{stop}{step}]')
+        return (f'{type(self).__name__}({self._at(indices.start)!r}, {self._at(indices.stop)!r}, '
+                f'{self.step}, TimeFrame.{self._frame.name})')
+
+    def buckets(self) -> Iterator[tuple[Datetime, Datetime]]:
+        """
+        逐个生成每一段的开始和结束（均包含），即当前元素和下一个元素往前一微秒，与 :meth:`Datetime.fill` 的风格相同。
+        步长为负数时，每一段是从下一个元素往后一微秒到当前元素。
+
+        >>> list(DatetimeRange(Datetime(2024, 1, 1), Datetime(2024, 3, 1), frame=TimeFrame.MONTH).buckets())
+        [(Datetime(2024, 1, 1, 0, 0), Datetime(2024, 1, 31, 23, 59, 59, 999999)),
+         (Datetime(2024, 2, 1, 0, 0), Datetime(2024, 2, 29, 23, 59, 59, 999999))]
+        """
+        indices = self._indices
+        forward = self._step * indices.step > 0
+        for k in indices:
+            current, following = self._at(k), self._at(k + indices.step)
+            yield (current, _as_datetime(following - _US)) if forward else (_as_datetime(following + _US), current)
+
+
+def datetimerange(
+        start: datetime,
+        stop: datetime,
+        step: int = 1,
+        frame: TimeFrame = TimeFrame.DAY,
+        closed=False,
+) -> DatetimeRange:
+    """
+    在一个日期时间范围内，按指定的单位和步长迭代生成 :class:`Datetime` 对象。
+
+    :param start: 开始时刻。
+    :param stop: 结束时刻。
+    :param step: 步长，即多少个 *frame* 单位。
+    :param frame: 步长的单位。
+    :param closed: 结束时刻是否可以到达。
+    :return: 可以反复迭代的 :class:`DatetimeRange` 对象。
+    """
+    return DatetimeRange(start, stop, step, frame, closed)
+
+
+class IntervalSet:
+    """
+    由若干个互不重叠的左闭右开区间 ``[start, end)`` 组成的集合，区间端点可以是任意可比较的对象，通常是 :class:`Datetime` 。
+
+    区间按开始时刻排序保存，重叠或首尾相接的区间会被合并，因此查询某个时刻是否被覆盖、
+    某段时间内有哪些空闲都只需二分查找，而不必两两比较。
+
+    >>> busy = IntervalSet([(Datetime(2024, 9, 20, 9), Datetime(2024, 9, 20, 10)),
+    >>>                     (Datetime(2024, 9, 20, 9, 30), Datetime(2024, 9, 20, 11))])
+    >>> busy.add(Datetime(2024, 9, 20, 14), Datetime(2024, 9, 20, 15))
+    >>> list(busy.gaps(Datetime(2024, 9, 20, 8), Datetime(2024, 9, 20, 18), Timedelta(hours=2)))
+    [(Datetime(2024, 9, 20, 11, 0), Datetime(2024, 9, 20, 14, 0)), (Datetime(2024, 9, 20, 15, 0), Datetime(2024, 9, 20, 18, 0))]
+    """
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, intervals: Iterable[tuple[datetime, datetime]] = ()):
+        """
+        :param intervals: 任意顺序的 ``(开始, 结束)`` 区间，可以相互重叠。
+        :raise ValueError: 某个区间的开始晚于结束。
+        """
+        self._starts, self._ends = [], []
+        for start, end in sorted(intervals, key=lambda interval: interval[0]):
+            if start > end:
+                raise ValueError(f'区间的开始 {start} 晚于结束 {end} 。')
+            if start == end:
+                continue
+            if self._ends and start <= self._ends[-1]:
+                if end > self._ends[-1]:
+                    self._ends[-1] = end
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    @classmethod
+    def _of(cls, starts: list, ends: list) -> IntervalSet:
+        self = cls.__new__(cls)
+        self._starts, self._ends = starts, ends
+        return self
+
+    def copy(self) -> IntervalSet:
+        return self._of(self._starts[:], self._ends[:])
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __iter__(self) -> Iterator[tuple[datetime, datetime]]:
+        return zip(self._starts, self._ends)
+
+    def __getitem__(self, index: int) -> tuple[datetime, datetime]:
+        return self._starts[index], self._ends[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, IntervalSet):
+            return self._starts == other._starts and self._ends == other._ends
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)!r})'
+
+    @property
+    def duration(self) -> Timedelta:
+        """
+        所有区间的总时长。
+        """
+        return Timedelta.of(sum(map(operator.sub, self._ends, self._starts), timedelta()))
+
+    # ---- 修改 ----
+
+    def add(self, start: datetime, end: datetime):
+        """
+        加入一个区间，与已有的重叠或首尾相接的区间合并。
+        """
+        if start > end:
+            raise ValueError(f'区间的开始 {start} 晚于结束 {end} 。')
+        if start == end:
+            return
+        starts, ends = self._starts, self._ends
+        i = bisect_left(ends, start)
+        j = bisect_right(starts, end)
+        if i < j:
+            start = min(start, starts[i])
+            end = max(end, ends[j - 1])
+        starts[i:j] = [start]
+        ends[i:j] = [end]
+
+    def remove(self, start: datetime, end: datetime):
+        """
+        移除一段时间，被部分覆盖的区间会被截短或拆成两个。
+        """
+        starts, ends = self._starts, self._ends
+        i = bisect_right(ends, start)
+        j = bisect_left(starts, end)
+        if i >= j or start >= end:
+            return
+        new_starts, new_ends = [], []
+        if starts[i] < start:
+            new_starts.append(starts[i])
+            new_ends.append(start)
+        if ends[j - 1] > end:
+            new_starts.append(end)
+            new_ends.append(ends[j - 1])
+        starts[i:j] = new_starts
+        ends[i:j] = new_ends
+
+    # ---- 查询 ----
+
+    def covering(self, moment: datetime) -> Optional[tuple[datetime, datetime]]:
+        """
+        覆盖某个时刻的区间。没有时返回 ``None`` 。
+        """
+        i = bisect_right(self._starts, moment) - 1
+        if i >= 0 and moment < self._ends[i]:
+            return self._starts[i], self._ends[i]
+        return None
+
+    def __contains__(self, moment: datetime) -> bool:
+        return self.covering(moment) is not None
+
+    def overlapping(self, start: datetime, end: datetime) -> Iterator[tuple[datetime, datetime]]:
+        """
+        与 ``[start, end)`` 有重叠的所有区间（不截短）。
+        """
+        i = bisect_right(self._ends, start)
+        j = bisect_left(self._starts, end)
+        return zip(self._starts[i:j], self._ends[i:j])
+
+    def gaps(
+            self,
+            start: datetime,
+            end: datetime,
+            duration: Optional[timedelta] = None,
+    ) -> Generator[tuple[datetime, datetime], None, None]:
+        """
+        ``[start, end)`` 之中没有被任何区间覆盖的空闲时段。
+
+        :param start: 开始时刻。
+        :param end: 结束时刻。
+        :param duration: 只产出不短于该时长的空闲时段。
+        """
+        starts, ends = self._starts, self._ends
+        cursor = start
+        for k in range(bisect_right(ends, start), len(starts)):
+            if starts[k] >= end:
+                break
+            if starts[k] > cursor and (duration is None or starts[k] - cursor >= duration):
+                yield cursor, starts[k]
+            cursor = max(cursor, ends[k])
+        if cursor < end and (duration is None or end - cursor >= duration):
+            yield cursor, end
+
+    # ---- 集合运算 ----
+
+    def union(self, other: IntervalSet) -> IntervalSet:
+        """
+        并集。
+        """
+        return type(self)(heapq.merge(self, other, key=lambda interval: interval[0]))
+
+    def intersection(self, other: IntervalSet) -> IntervalSet:
+        """
+        交集。
+        """
+        a_starts, a_ends, b_starts, b_ends = self._starts, self._ends, other._starts, other._ends
+        starts, ends = [], []
+        i = j = 0
+        while i < len(a_starts) and j < len(b_starts):
+            start = max(a_starts[i], b_starts[j])
+            end = min(a_ends[i], b_ends[j])
+            if start < end:
+                starts.append(start)
+                ends.append(end)
+            if a_ends[i] < b_ends[j]:
+                i += 1
+            else:
+                j += 1
+        return self._of(starts, ends)
+
+    def difference(self, other: IntervalSet) -> IntervalSet:
+        """
+        差集。
+        """
+        b_starts, b_ends = other._starts, other._ends
+        starts, ends = [], []
+        j = 0
+        for start, end in self:
+            while j < len(b_starts) and b_ends[j] <= start:
+                j += 1
+            k = j
+            while k < len(b_starts) and b_starts[k] < end:
+                if b_starts[k] > start:
+                    starts.append(start)
+                    ends.append(b_starts[k])
+                start = max(start, b_ends[k])
+                k += 1
+            if start < end:
+                starts.append(start)
+                ends.append(end)
+        return self._of(starts, ends)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+
+class BusinessCalendar:
+    """
+    工作日历。
+
+    按每周固定的休息日，加上节假日和调休（休息日改为上班）计算工作日。
+    以日期的 :meth:`序数 <date.toordinal>` 为自变量预先建立索引，判断是否为工作日是 O(1) ，
+    计算两个日期之间有多少个工作日是 O(log n) ，推算 N 个工作日之后是哪一天是 O(log² n) ，
+    n 为节假日与调休的数量，与日期跨度无关。
+
+    >>> calendar = BusinessCalendar(holidays=[date(2024, 10, d) for d in range(1, 8)],
+    >>>                             workdays=[date(2024, 9, 29), date(2024, 10, 12)])
+    >>> calendar.count(date(2024, 9, 23), date(2024, 10, 14))
+    12
+    >>> calendar.add(date(2024, 9, 30), 1)
+    datetime.date(2024, 10, 8)
+
+    所有方法都接受 :class:`date` 、:class:`datetime` 或 :class:`Datetime` ，推算日期时会保留时间部分。
+    """
+
+    def __init__(
+            self,
+            holidays: Iterable[date] = (),
+            workdays: Iterable[date] = (),
+            weekends: Iterable[int] = (0, 6),
+    ):
+        """
+        :param holidays: 节假日。本来就是休息日的会被忽略。
+        :param workdays: 调休上班的日子。本来就是工作日的会被忽略。
+        :param weekends: 每周固定的休息日。``0`` 表示周日、``1`` 表示周一，以此类推。默认是周六和周日。
+        :raise ValueError: 同一天既是节假日又要调休上班，或者一周中没有任何工作日也没有调休。
+        """
+        weekends = frozenset(weekends)
+        if not weekends <= frozenset(range(7)):
+            raise ValueError(f'休息日 {sorted(weekends)} 超出了 0~6 的范围。')
+        holidays = {day.toordinal() for day in holidays}
+        workdays = {day.toordinal() for day in workdays}
+        if holidays & workdays:
+            day = date.fromordinal(min(holidays & workdays))
+            raise ValueError(f'{day} 不能既是节假日又调休上班。')
+
+        # 序数对 7 取余恰好是 0 表示周日、1 表示周一……
+        self._weekends = weekends
+        self._prefix = [0]
+        for weekday in range(7):
+            self._prefix.append(self._prefix[-1] + (weekday not in weekends))
+        self._holidays = sorted(o for o in holidays if o % 7 not in weekends)
+        self._workdays = sorted(o for o in workdays if o % 7 in weekends)
+        self._holiday_set = frozenset(self._holidays)
+        self._workday_set = frozenset(self._workdays)
+        if self._prefix[7] == 0 and not self._workdays:
+            raise ValueError('没有任何工作日。')
+
+    def _before(self, ordinal: int) -> int:
+        """
+        序数小于 *ordinal* 的日子中有多少个工作日（以序数 0 为起点）。
+        """
+        weeks, weekday = divmod(ordinal, 7)
+        return (
+                weeks * self._prefix[7] + self._prefix[weekday]
+                - bisect_left(self._holidays, ordinal)
+                + bisect_left(self._workdays, ordinal)
+        )
+
+    def _nth(self, k: int, hint: int) -> int:
+        """
+        从序数 0 开始数第 *k* 个（从 1 开始）工作日的序数，*hint* 是大致的位置。
+        """
+        if self._prefix[7] == 0 and not 1 <= k <= len(self._workdays):
+            # 只有调休上班的日子时工作日是有限的，超出范围后 _before() 不再变化，倍增永远不会停止
+            raise ValueError('超出了调休上班的日子的范围，找不到这个工作日。')
+        # 先以 hint 为中心倍增确定范围，再二分查找满足 _before(x + 1) >= k 的最小的 x
+        step = 8
+        low, high = hint, hint
+        while self._before(low + 1) >= k:
+            low -= step
+            step *= 2
+        step = 8
+        while self._before(high + 1) < k:
+            high += step
+            step *= 2
+        while low < high:
+            middle = (low + high) // 2
+            if self._before(middle + 1) >= k:
+                high = middle
+            else:
+                low = middle + 1
+        return high
+
+    def is_working(self, day: date) -> bool:
+        """
+        是否为工作日。
+        """
+        ordinal = day.toordinal()
+        if ordinal % 7 in self._weekends:
+            return ordinal in self._workday_set
+        return ordinal not in self._holiday_set
+
+    __contains__ = is_working
+
+    def count(self, start: date, stop: date, closed=False) -> int:
+        """
+        一个日期范围内有多少个工作日。
+
+        :param start: 开始日期（包含）。
+        :param stop: 结束日期。
+        :param closed: 是否包含结束日期。
+        :return: 工作日的数量。结束日期早于开始日期时为负数。
+        """
+        return self._before(stop.toordinal() + closed) - self._before(start.toordinal())
+
+    def add(self, day: date, n: int) -> date:
+        """
+        推算第 N 个工作日。
+
+        - ``n > 0`` 时是当天之后（不含当天）的第 N 个工作日；
+        - ``n < 0`` 时是当天之前（不含当天）的倒数第 N 个工作日；
+        - ``n == 0`` 时是当天本身。
+
+        :param day: 从哪一天开始推算。
+        :param n: 多少个工作日。
+        :return: 与 *day* 类型相同的日期，时间部分保持不变。
+        :raise ValueError: 一周中没有任何工作日，而推算的日子超出了调休上班的日子的范围。
+        """
+        if n == 0:
+            return day
+        ordinal = day.toordinal()
+        if n > 0:
+            k = self._before(ordinal + 1) + n
+        else:
+            k = self._before(ordinal) + n + 1
+        hint = ordinal + n * 7 // max(self._prefix[7], 1)
+        return day + timedelta(days=self._nth(k, hint) - ordinal)
+
+    def daterange(self, start: date, stop: date, closed=False) -> Iterator[date]:
+        """
+        按顺序迭代一个日期范围内的所有工作日，参数与 :func:`daterange` 相同。
+        """
+        return filter(self.is_working, daterange(start, stop, closed=closed))
+
+
+class Schedule(ABC):
+    """
+    定时计划。子类负责直接计算下一次、上一次触发的时刻，而不是逐分钟试探。
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def next(self, after: datetime) -> Datetime:
+        """
+        某个时刻之后（不含）的第一次触发时刻。
+
+        :raise ValueError: 在 :data:`datetime.MAXYEAR` 以前不再触发。
+        """
+
+    @abstractmethod
+    def previous(self, before: datetime) -> Datetime:
+        """
+        某个时刻之前（不含）的最后一次触发时刻。
+
+        :raise ValueError: 在 :data:`datetime.MINYEAR` 以来从未触发。
+        """
+
+    def upcoming(self, after: datetime, limit: Optional[int] = None) -> Generator[Datetime, None, None]:
+        """
+        按需逐个生成某个时刻之后（不含）的触发时刻。到 :data:`datetime.MAXYEAR` 为止不再触发时提前结束。
+
+        :param after: 从哪个时刻开始。
+        :param limit: 最多生成多少个。默认不限。
+        """
+        moments = range(limit) if limit is not None else count()
+        for _ in moments:
+            try:
+                after = self.next(after)
+            except ValueError:
+                return
+            yield after
+
+
+_CRON_ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+_CRON_NAMES = {
+    **{name: i for i, name in enumerate(('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+                                         'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'), 1)},
+    **{name: i for i, name in enumerate(('SUN', 'MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT'))},
+}
+
+
+class Cron(Schedule):
+    """
+    Cron 表达式形式的定时计划。
+
+    支持 ``分 时 日 月 星期`` 五个字段，每个字段可以是 ``*`` 、``5`` 、``1-5`` 、``*/15`` 、``1-30/2`` 以及它们用逗号连接的列表，
+    月份和星期可以使用 ``JAN`` 、``MON`` 等英文缩写，星期的 ``0`` 和 ``7`` 都表示周日；
+    也支持 ``@daily`` 、``@hourly`` 等别名。
+    与常见的实现一样，日和星期都有限制时，满足其一即可。
+
+    >>> cron = Cron('30 4 * * MON-FRI')
+    >>> cron.next(Datetime(2024, 9, 20, 5))
+    Datetime(2024, 9, 23, 4, 30)
+
+    计算时逐个字段向后（或向前）对齐，大多数情况下只需常数次运算。
+    时刻按墙上时间计算，会保留传入时刻的时区，但不处理夏令时的跳变。
+    """
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays', '_any_day', '_any_weekday')
+
+    def __init__(self, expression: str):
+        """
+        :param expression: Cron 表达式。
+        :raise ValueError: 表达式有误，或者永远不会触发（比如 2 月 30 日）。
+        """
+        self.expression = expression
+        fields = _CRON_ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f'Cron 表达式 {expression!r} 须由五个字段组成。')
+        self.minutes = self._parse(fields[0], 0, 59)
+        self.hours = self._parse(fields[1], 0, 23)
+        self.days = self._parse(fields[2], 1, 31)
+        self.months = self._parse(fields[3], 1, 12)
+        self.weekdays = tuple(sorted({w % 7 for w in self._parse(fields[4], 0, 7)}))
+        self._any_day = fields[2].startswith('*')
+        self._any_weekday = fields[4].startswith('*')
+        # 只限制了日期时，检查是否每个月都没有这些日子；闰年的 2 月 29 日每隔若干年总会出现
+        if self._any_weekday and not self._any_day and all(
+                self.days[0] > (29 if month == 2 else Datetime.DAYS_IN_MONTH[month]) for month in self.months
+        ):
+            raise ValueError(f'Cron 表达式 {expression!r} 永远不会触发。')
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> tuple[int, ...]:
+        def value(text: str) -> int:
+            number = _CRON_NAMES.get(text.upper()) if not text.isdigit() else int(text)
+            if number is None or not low <= number <= high:
+                raise ValueError(f'Cron 字段 {field!r} 中的 {text!r} 超出了 {low}~{high} 的范围。')
+            return number
+
+        values = set()
+        for part in field.split(','):
+            base, _, step = part.partition('/')
+            if base == '*':
+                start, stop = low, high
+            elif '-' in base:
+                start, _, stop = base.partition('-')
+                start, stop = value(start), value(stop)
+            else:
+                start = stop = value(base)
+                if step:
+                    stop = high
+            step = int(step) if step else 1
+            if step < 1 or start > stop:
+                raise ValueError(f'Cron 字段 {field!r} 有误。')
+            values.update(range(start, stop + 1, step))
+        return tuple(sorted(values))
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.expression!r})'
+
+    def _match(self, first: int, day: int) -> bool:
+        """
+        某个月的某一天是否满足日和星期的限制。*first* 是该月 1 日的序数。
+        """
+        day_ok = day in self.days
+        weekday_ok = (first + day - 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next(self, after: datetime) -> Datetime:
+        # 分钟加一后可能越界，越界的部分会在下面逐个字段对齐时进位
+        year, month, day, hour, minute = after.year, after.month, after.day, after.hour, after.minute + 1
+        minutes, hours, months = self.minutes, self.hours, self.months
+        while year <= MAXYEAR:
+            if month not in months:
+                i = bisect_left(months, month)
+                if i == len(months):
+                    year, month = year + 1, months[0]
+                else:
+                    month = months[i]
+                day, hour, minute = 1, hours[0], minutes[0]
+                continue
+            first = date(year, month, 1).toordinal()
+            last = get_last_monthday(year, month)
+            found = next((d for d in range(day, last + 1) if self._match(first, d)), None)
+            if found is None:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                day, hour, minute = 1, hours[0], minutes[0]
+                continue
+            if found != day:
+                day, hour, minute = found, hours[0], minutes[0]
+            if hour not in hours:
+                i = bisect_left(hours, hour)
+                if i == len(hours):
+                    day, hour, minute = day + 1, hours[0], minutes[0]
+                    continue
+                hour, minute = hours[i], minutes[0]
+            if minute not in minutes:
+                i = bisect_left(minutes, minute)
+                if i == len(minutes):
+                    hour, minute = hour + 1, minutes[0]
+                    continue
+                minute = minutes[i]
+            return Datetime(year, month, day, hour, minute, tzinfo=after.tzinfo)
+        raise ValueError(f'{after} 之后不再触发。')
+
+    def previous(self, before: datetime) -> Datetime:
+        year, month, day, hour, minute = before.year, before.month, before.day, before.hour, before.minute
+        if not before.second and not before.microsecond:
+            minute -= 1
+        minutes, hours, months = self.minutes, self.hours, self.months
+        while year >= MINYEAR:
+            if month not in months:
+                i = bisect_left(months, month) - 1
+                if i < 0:
+                    year, month = year - 1, months[-1]
+                else:
+                    month = months[i]
+                day, hour, minute = 31, hours[-1], minutes[-1]
+                continue
+            first = date(year, month, 1).toordinal()
+            day = min(day, get_last_monthday(year, month))
+            found = next((d for d in range(day, 0, -1) if self._match(first, d)), None)
+            if found is None:
+                year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+                day, hour, minute = 31, hours[-1], minutes[-1]
+                continue
+            if found != day:
+                day, hour, minute = found, hours[-1], minutes[-1]
+            if hour not in hours:
+                i = bisect_left(hours, hour) - 1
+                if i < 0:
+                    day, hour, minute = day - 1, hours[-1], minutes[-1]
+                    continue
+                hour, minute = hours[i], minutes[-1]
+            if minute not in minutes:
+                i = bisect_left(minutes, minute) - 1
+                if i < 0:
+                    hour, minute = hour - 1, minutes[-1]
+                    continue
+                minute = minutes[i]
+            return Datetime(year, month, day, hour, minute, tzinfo=before.tzinfo)
+        raise ValueError(f'{before} 之前从未触发。')
+
+
+class Every(Schedule):
+    """
+    每隔固定时长触发的定时计划。
+
+    以 *anchor* 为基准，每隔 *n* 个 *frame* 触发一次。按月或按年时以月份计算，
+    日子超过当月最后一天时取当月最后一天，比如从 1 月 31 日起每月一次，2 月会在 28 日或 29 日触发。
+
+    >>> every = Every(15, TimeFrame.MINUTE)
+    >>> every.next(Datetime(2024, 9, 20, 5, 7))
+    Datetime(2024, 9, 20, 5, 15)
+    >>> Every(1, TimeFrame.MONTH, anchor=Datetime(2024, 1, 31, 9)).next(Datetime(2024, 2, 1))
+    Datetime(2024, 2, 29, 9, 0)
+    """
+    __slots__ = ('n', 'frame', 'anchor', '_step', '_months')
+
+    def __init__(self, n: int = 1, frame: TimeFrame = TimeFrame.DAY, anchor: Optional[datetime] = None):
+        """
+        :param n: 间隔多少个单位。
+        :param frame: 间隔的单位。
+        :param anchor: 基准时刻，也是其中一次触发的时刻。默认是 1970-01-01 00:00:00 ，时区与传入的时刻相同。
+        :raise ValueError: 间隔不是正数。
+        """
+        if n < 1:
+            raise ValueError(f'间隔 {n} 须为正数。')
+        self.n = n
+        self.frame = frame
+        self.anchor = None if anchor is None else Datetime.of(anchor)
+        self._step = _FRAME_STEPS[frame] * n if frame in _FRAME_STEPS else None
+        self._months = n * 12 if frame == TimeFrame.YEAR else n
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.n!r}, TimeFrame.{self.frame.name}, anchor={self.anchor!r})'
+
+    def _anchor(self, moment: datetime) -> Datetime:
+        return self.anchor if self.anchor is not None else Datetime(1970, 1, 1, tzinfo=moment.tzinfo)
+
+    def _fire(self, anchor: Datetime, k: int) -> Datetime:
+        return _shift_months(anchor, k * self._months)
+
+    def next(self, after: datetime) -> Datetime:
+        anchor = self._anchor(after)
+        try:
+            if self._step is not None:
+                return anchor + ((after - anchor) // self._step + 1) * self._step
+            k = ((after.year - anchor.year) * 12 + after.month - anchor.month) // self._months
+            moment = self._fire(anchor, k)
+            while moment <= after:
+                k += 1
+                moment = self._fire(anchor, k)
+            return moment
+        except (OverflowError, ValueError):
+            # 超出了 datetime 所能表示的范围
+            raise ValueError(f'{after} 之后不再触发。') from None
+
+    def previous(self, before: datetime) -> Datetime:
+        anchor = self._anchor(before)
+        try:
+            if self._step is not None:
+                return anchor - ((anchor - before) // self._step + 1) * self._step
+            k = ((before.year - anchor.year) * 12 + before.month - anchor.month) // self._months
+            moment = self._fire(anchor, k)
+            while moment >= before:
+                k -= 1
+                moment = self._fire(anchor, k)
+            return moment
+        except (OverflowError, ValueError):
+            raise ValueError(f'{before} 之前从未触发。') from None
+
+
+class ZoneConverter:
+    """
+    批量将 UTC 时刻转换为某个时区的本地时刻。
+
+    创建时预先计算该时区在一段年份内所有 UTC 偏移量的跳变时刻，之后每次转换只需二分查找，
+    而不必每次都向时区查询，并正确设置夏令时结束后重复的那段本地时间的 ``fold`` 。
+    超出年份范围的时刻仍然交给时区自己计算。
+
+    >>> from zoneinfo import ZoneInfo
+    >>> converter = ZoneConverter.of(ZoneInfo('America/New_York'))
+    >>> converter.convert(Datetime(2024, 11, 3, 6, 30))
+    Datetime(2024, 11, 3, 1, 30, fold=1, tzinfo=zoneinfo.ZoneInfo(key='America/New_York'))
+
+    跳变时刻是按天采样后再二分查找得到的，因此一天之内来回跳变两次的情况无法识别，现实中的时区数据没有这种情况。
+    """
+    __slots__ = ('zone', 'start', 'stop', '_moments', '_offsets', '_folds', '_micros', '_micro_offsets')
+
+    def __init__(self, zone: tzinfo, start: int = 1970, stop: int = 2038):
+        """
+        :param zone: 目标时区。
+        :param start: 预先计算的第一个年份（包含）。
+        :param stop: 预先计算的最后一个年份（不包含）。
+        """
+        self.zone = zone
+        self.start = datetime(start, 1, 1)
+        self.stop = datetime(stop, 1, 1)
+
+        def offset(moment: datetime) -> timedelta:
+            return datetime.replace(moment, tzinfo=timezone.utc).astimezone(zone).utcoffset()
+
+        day, second = timedelta(days=1), timedelta(seconds=1)
+        moments, offsets, folds = [], [offset(self.start)], []
+        previous = self.start
+        while previous < self.stop:
+            current = min(previous + day, self.stop)
+            if offset(current) != offsets[-1]:
+                # 跳变时刻在 (previous, current] 之中，时区数据总是精确到秒
+                low, high = previous, current
+                while high - low > second:
+                    middle = low + (high - low) // 2 // second * second
+                    if offset(middle) == offsets[-1]:
+                        low = middle
+                    else:
+                        high = middle
+                moments.append(high)
+                offsets.append(offset(high))
+                # 偏移量变小时，接下来的一段本地时间与跳变前的重复
+                folds.append(high + max(offsets[-2] - offsets[-1], timedelta()))
+            previous = current
+
+        self._moments = moments
+        self._offsets = offsets
+        self._folds = folds
+        self._micros = [(moment - _EPOCH) // _US for moment in moments]
+        self._micro_offsets = [delta // _US for delta in offsets]
+
+    @classmethod
+    def of(cls, zone: tzinfo, start: int = 1970, stop: int = 2038) -> ZoneConverter:
+        """
+        获取某个时区的转换器。最近用过的转换器会被缓存，不会重复计算。
+        """
+        return _zone_converter(cls, zone, start, stop)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.zone!r}, {self.start.year}, {self.stop.year})'
+
+    def convert(self, moment: datetime) -> datetime:
+        """
+        将 UTC 时刻转换为本地时刻。
+
+        :param moment: 不带时区的 UTC 时刻，或者任意带时区的时刻。
+        :return: 带时区的本地时刻，类型与 *moment* 相同。
+        """
+        # Python 3.8 以前，datetime 子类的运算结果是 datetime ，因此记下原本的类型，构造结果时使用
+        cls = type(moment)
+        if moment.tzinfo is not None:
+            moment = datetime.replace(moment.astimezone(timezone.utc), tzinfo=None)
+        if not self.start <= moment < self.stop:
+            local = datetime.replace(moment, tzinfo=timezone.utc).astimezone(self.zone)
+            if type(local) is cls:
+                return local
+            return cls(
+                local.year, local.month, local.day, local.hour, local.minute, local.second, local.microsecond,
+                local.tzinfo, fold=local.fold,
+            )
+        i = bisect_right(self._moments, moment)
+        local = moment + self._offsets[i]
+        # 直接构造比 replace() 快得多，fold 只在少数时候需要传入
+        if i and moment < self._folds[i - 1]:
+            return cls(
+                local.year, local.month, local.day, local.hour, local.minute, local.second, local.microsecond,
+                self.zone, fold=1,
+            )
+        return cls(
+            local.year, local.month, local.day, local.hour, local.minute, local.second, local.microsecond, self.zone,
+        )
+
+    def convert_many(self, moments: Iterable[datetime]) -> Generator[datetime, None, None]:
+        """
+        逐个转换，与对每个时刻调用 :meth:`convert` 相同。
+        """
+        return (self.convert(moment) for moment in moments)
+
+    def localize(self, column: DatetimeArray) -> DatetimeArray:
+        """
+        将 UTC 时刻组成的数组整体转换为本地的墙上时间，结果仍然不带时区，可以继续按本地时间 :meth:`DatetimeArray.empty` 。
+        安装了 NumPy 时会改用 ``searchsorted`` 计算。
+        """
+        low, high = (self.start - _EPOCH) // _US, (self.stop - _EPOCH) // _US
+        values = column.values
+        if numpy is not None:
+            micros = numpy.frombuffer(values, dtype='int64')
+            shifts = numpy.asarray(self._micro_offsets, dtype='int64')[
+                numpy.searchsorted(numpy.asarray(self._micros, dtype='int64'), micros, side='right')
+            ]
+            outside = (micros < low) | (micros >= high)
+            result = micros + shifts
+            for i in numpy.flatnonzero(outside).tolist():
+                result[i] = self._localize(values[i])
+            return DatetimeArray.frommicroseconds(_fromnumpy(result))
+
+        transitions, offsets = self._micros, self._micro_offsets
+        return DatetimeArray.frommicroseconds(array('q', [
+            v + offsets[bisect_right(transitions, v)] if low <= v < high else self._localize(v)
+            for v in values
+        ]))
+
+    def _localize(self, value: int) -> int:
+        moment = datetime.replace(_EPOCH + timedelta(microseconds=value), tzinfo=timezone.utc)
+        return value + moment.astimezone(self.zone).utcoffset() // _US
+
+
+@lru_cache(maxsize=64)
+def _zone_converter(cls: type, zone: tzinfo, start: int, stop: int) -> ZoneConverter:
+    return cls(zone, start, stop)
+
+
+class CoarseClock:
+    """
+    粗粒度的缓存时钟。
+
+    在一个精度周期内反复调用 :meth:`now` 只会得到同一个缓存的 :class:`Datetime` 对象，
+    判断是否过期只需读取一次单调时钟，比每次都构造新的日期时间对象便宜得多，适合给大量记录打上毫秒级或秒级的时间戳。
+
+    >>> clock = CoarseClock(timedelta(milliseconds=1))
+    >>> clock.now()
+    Datetime(2024, 9, 20, 11, 22, 33, 245678)
+    >>> clock.bounds(TimeFrame.DAY)
+    (Datetime(2024, 9, 20, 0, 0), Datetime(2024, 9, 20, 23, 59, 59, 999999))
+
+    读取不加锁，刷新时加锁，因此多个线程同时使用时，返回的时刻不会倒退。
+    """
+    __slots__ = ('resolution', 'tz', '_step', '_state', '_bounds', '_lock')
+
+    def __init__(self, resolution: timedelta = timedelta(milliseconds=1), tz: Optional[tzinfo] = None):
+        """
+        :param resolution: 精度，即缓存的时刻多久刷新一次。
+        :param tz: 时区，与 :meth:`datetime.now` 的参数相同。默认是不带时区的本地时间。
+        """
+        self.resolution = resolution
+        self.tz = tz
+        self._step = resolution // _US * 1000
+        # 过期的单调时钟读数与缓存的时刻放在同一个元组中，以便原子地替换
+        self._state = (0, None)
+        self._bounds = {}
+        self._lock = threading.Lock()
+
+    def now(self) -> Datetime:
+        """
+        当前时刻，误差不超过一个精度周期。
+        """
+        state = self._state
+        if monotonic_ns() < state[0]:
+            return state[1]
+        with self._lock:
+            ticks = monotonic_ns()
+            state = self._state
+            if ticks < state[0]:
+                return state[1]
+            now = Datetime.now(self.tz)
+            if state[1] is not None and now < state[1]:
+                now = state[1]  # 系统时间被往回调整时，保持不倒退
+            self._state = (ticks + self._step, now)
+            return now
+
+    def bounds(self, keeping_level: TimeFrame = TimeFrame.DAY) -> tuple[Datetime, Datetime]:
+        """
+        当前时刻所在的时间段的开始和结束，比如今天的零点和最后一微秒，由 :meth:`Datetime.empty` 和 :meth:`Datetime.fill` 计算，
+        在进入下一个时间段之前一直使用缓存。
+        """
+        now = self.now()
+        bounds = self._bounds.get(keeping_level)
+        if bounds is None or not bounds[0] <= now <= bounds[1]:
+            bounds = self._bounds[keeping_level] = (now.empty(keeping_level), now.fill(keeping_level))
+        return bounds
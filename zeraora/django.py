@@ -9,15 +9,31 @@ __all__ = [
     'HasBits',
     'HasAllBits',
     'NotAnyBits',
+    'TimingMiddleware',
 ]
 
-from typing import Any
+from contextlib import ExitStack
+from time import perf_counter_ns
+from typing import Any, Callable
 
 from django.apps import apps
-from django.db import models
+from django.conf import settings
+from django.db import connections, models
 
+from zeraora.datetime import BearTimer, TimerRegistry
 from zeraora.string import case_camel_to_snake
 
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:
+    # asgiref 3.6 以前没有这两个函数，Django 2.x 则根本不依赖 asgiref ，
+    # 此时与 Django 3.x/4.0 的中间件一样，直接设置 asyncio 识别的标记。
+    from asyncio import coroutines, iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = coroutines._is_coroutine
+        return func
+
 
 class SnakeModel(models.base.ModelBase):
     """
@@ -119,3 +135,123 @@ class NotAnyBits(models.Lookup):
         rhs, rhs_params = self.process_rhs(compiler, connection)
         params = lhs_params + rhs_params
         return '%s & %s = 0' % (lhs, rhs), params
+
+
+class _QueryTimer:
+    """
+    通过 :meth:`connection.execute_wrapper() <django.db.backends.base.base.BaseDatabaseWrapper.execute_wrapper>`
+    累计一次请求中所有 SQL 的耗时。
+    """
+    __slots__ = ('clock', 'count', 'total')
+
+    def __init__(self, clock: Callable[[], int]):
+        self.clock = clock
+        self.count = 0
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        begin = self.clock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total += self.clock() - begin
+            self.count += 1
+
+
+class TimingMiddleware:
+    """
+    为每个请求计时的中间件。
+
+    - 在响应中添加 ``Server-Timing`` 头，浏览器的开发者工具可以直接展示；
+    - 按 ``请求方法 + 路由`` 将总耗时汇总到 :attr:`BearTimer.REGISTRY <zeraora.datetime.BearTimer.REGISTRY>` ，
+      于是无需在每个视图中手动计时，就能查询每个接口的分位数；
+    - 同步请求还可以统计数据库查询的次数和耗时。默认只在 ``settings.DEBUG`` 为真时统计，
+      以免在生产环境中将后端的细节暴露给每一个客户端。
+
+    ----
+
+    用法如下： ::
+
+        # ./settings.py
+
+        MIDDLEWARE = [
+            'zeraora.django.TimingMiddleware',
+            'django.middleware.security.SecurityMiddleware',
+            # ...
+        ]
+
+    放在越靠前的位置，统计到的耗时越接近整个请求的耗时。之后可以随时查询： ::
+
+        >>> BearTimer.REGISTRY['GET api/orders/<int:pk>/'].percentile(99)
+        8172543
+
+    没有匹配到路由的请求（比如 404）只添加响应头，不参与汇总，以免扫描路径的请求撑爆汇总表。
+
+    在 ASGI 下，同步视图和 ORM 运行在其它线程中，数据库连接是线程隔离的，因此无法统计数据库耗时。
+
+    可以通过继承来修改配置： ::
+
+        class MyTimingMiddleware(TimingMiddleware):
+            header = ''  # 不添加响应头
+            database = True  # 在生产环境中也统计数据库耗时
+            registry = TimerRegistry()
+    """
+    sync_capable = True
+    async_capable = True
+
+    header = 'Server-Timing'
+    """响应头的名称。为空时不添加响应头。"""
+    database: bool | None = None
+    """是否统计数据库查询的次数和耗时，并添加到响应头中。为 ``None`` 时跟随 ``settings.DEBUG`` 。"""
+    registry: TimerRegistry | None = BearTimer.REGISTRY
+    """汇总每个接口耗时的注册表。为 ``None`` 时不汇总。"""
+    clock: Callable[[], int] = staticmethod(perf_counter_ns)
+    """计时所用的时钟，须返回以纳秒为单位的整数。"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        database = settings.DEBUG if self.database is None else self.database
+        queries = _QueryTimer(self.clock) if database else None
+        begin = self.clock()
+        with ExitStack() as stack:
+            if queries is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        return self.finish(request, response, self.clock() - begin, queries)
+
+    async def __acall__(self, request):
+        begin = self.clock()
+        response = await self.get_response(request)
+        return self.finish(request, response, self.clock() - begin, None)
+
+    def label(self, request) -> str | None:
+        """
+        汇总时所用的标题。返回 ``None`` 表示不汇总。
+
+        默认是请求方法加上匹配到的路由，而不是实际的路径，以免 ``/orders/1/`` 和 ``/orders/2/`` 被分开汇总。
+        """
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        return f'{request.method} {match.route or match.view_name}'
+
+    def finish(self, request, response, total: int, queries: _QueryTimer | None):
+        if self.registry is not None:
+            label = self.label(request)
+            if label is not None:
+                self.registry.record(label, total)
+        if self.header:
+            metrics = [f'total;dur={total / 1e6:.3f}']
+            if queries is not None:
+                metrics.append(f'db;dur={queries.total / 1e6:.3f};desc="{queries.count} queries"')
+            if self.header in response:
+                metrics.insert(0, response[self.header])
+            response[self.header] = ', '.join(metrics)
+        return response
@@ -9,7 +9,19 @@ __all__ = [
 ]
 
 import enum
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
+
+
+def _getproperty(member: enum.Enum, name: str) -> Any:
+    # 只在 __properties__ 中声明而没有定义同名 property 时，才直接取出保存的值；
+    # 定义了 property 时，getter 抛出的异常（包括 AttributeError ）原样向外抛出。
+    if any(name in vars(klass) for klass in type(member).__mro__):
+        return getattr(member, name)
+    try:
+        return member.__dict__[f'_{name}_']
+    except KeyError:
+        raise AttributeError(f'{member!r} 没有 {name} 属性的值。') from None
 
 
 class ItemsMeta(enum.EnumMeta):
@@ -57,63 +69,148 @@ class ItemsMeta(enum.EnumMeta):
         for member, pvs in zip(cls.__members__.values(), pvs_list):
             member.__dict__.update(zip(pks, pvs))
 
+        # 为枚举值建立索引，按值查找时无需逐个比较；属性的索引在第一次按属性查找时才建立
+        members = tuple(cls.__members__.values())
+        cls._properties_ = tuple(pk[1:-1] for pk in pks)
+        cls._columns_ = {'value': tuple(member.value for member in members)}
+        cls._indexes_, cls._unhashables_ = {}, {}
+        cls._index('value')
+
+        # 名称和值在类创建后就不会再变，事先算好，访问时直接返回
+        empty = hasattr(cls, '__empty__')
+        cls._names_ = ('__empty__',) * empty + tuple(member.name for member in members)
+        cls._values_ = (None,) * empty + cls._columns_['value']
+        cls._items_ = MappingProxyType(dict(zip(cls._names_, cls._values_)))
+        # 属性的 getter 可能依赖运行时的状态（比如翻译、配置），也可能抛出异常，
+        # 因此复数形式的属性和 choices 在第一次访问时才计算，之后返回同一个对象。
+        # 与原先逐次截取属性名时相同，"s" 结尾的名称优先于 "es" 结尾的名称
+        plurals = {f'{name}es': name for name in cls._properties_}
+        plurals.update((f'{name}s', name) for name in cls._properties_)
+        cls._plurals_ = plurals
+        cls._choices_ = None
+
         return enum.unique(cls)
 
     def __contains__(cls, member):
         if not isinstance(member, enum.Enum):
             # Allow non-enums to match against member values.
-            return any(x.value == member for x in cls)
+            return cls._find('value', member) is not None
         return super().__contains__(member)
 
+    def _column(cls, name: str) -> tuple:
+        # 所有成员的某个属性值，第一次访问时才计算
+        column = cls._columns_.get(name)
+        if column is None:
+            column = cls._columns_[name] = tuple(_getproperty(member, name) for member in cls.__members__.values())
+        return column
+
+    def _index(cls, name: str) -> tuple[dict, list]:
+        # 属性值到成员的索引，以及不可哈希、只能逐个比较的属性值
+        index = cls._indexes_.get(name)
+        if index is None:
+            index, unhashable = {}, []
+            for pv, member in zip(cls._column(name), cls.__members__.values()):
+                try:
+                    index.setdefault(pv, member)
+                except TypeError:
+                    unhashable.append((pv, member))
+            cls._unhashables_[name] = unhashable
+            cls._indexes_[name] = index
+        return index, cls._unhashables_[name]
+
+    def _find(cls, name: str, value) -> enum.Enum | None:
+        index, unhashable = cls._index(name)
+        try:
+            found = index.get(value)
+        except TypeError:
+            # 要找的值不可哈希，只能与所有成员逐个比较
+            pairs = zip(cls._column(name), cls.__members__.values())
+        else:
+            if found is not None:
+                return found
+            pairs = unhashable
+        for pv, member in pairs:
+            if pv == value:
+                return member
+        return None
+
+    def by(cls, name: str, value) -> enum.Enum:
+        """
+        按枚举值或 ``__properties__`` 中的某个属性查找枚举成员。
+        除了不可哈希的值以外，都只需查一次索引，而不必逐个比较。
+        属性的索引在第一次按该属性查找时建立，与复数形式的属性一样只计算一次。
+
+        >>> Grade.by('code', 'SR')
+        Grade.SENIOR
+
+        多个成员的属性值相同时，返回最先定义的那一个。
+
+        :param name: ``'value'`` 或 ``__properties__`` 中的属性名。
+        :param value: 属性值。
+        :return: 枚举成员。
+        :raise KeyError: *name* 不是可供查找的属性。
+        :raise ValueError: 没有成员的属性值等于 *value* 。
+        """
+        if name != 'value' and name not in cls._properties_:
+            raise KeyError(f'{cls.__name__} 中没有名为 {name} 的属性可供查找。')
+        member = cls._find(name, value)
+        if member is None:
+            raise ValueError(f'{value!r} 不是 {cls.__name__} 中任何成员的 {name} 。')
+        return member
+
     def __getattr__(cls, name):
         if not isinstance(name, str):
             raise TypeError  # pragma: no cover
-        if name[:-1] in cls.__properties__ and name.endswith('s'):
-            return [getattr(member, name[:-1]) for member in cls]
-        if name[:-2] in cls.__properties__ and name.endswith('es'):
-            return [getattr(member, name[:-2]) for member in cls]
+        try:
+            plurals = object.__getattribute__(cls, '_plurals_')
+        except AttributeError:
+            plurals = {}
+        if name in plurals:
+            return cls._column(plurals[name])
         return object.__getattribute__(cls, name)
 
     # 对 __empty__ 属性的支持是为了与 Django 的 Choices 相兼容，可参见：
     # https://docs.djangoproject.com/zh-hans/4.2/ref/models/fields/#enumeration-types
+    # 以下属性以及复数形式的属性（比如 codes ）都只计算一次，之后返回同一个不可变对象。
+    # 名称和值在类创建时计算；choices 和复数形式的属性则在第一次访问时才调用各个成员的 getter ，
+    # 之后不再调用，因此 getter 如果依赖运行时的状态（比如 gettext() 翻译的标签），
+    # 请返回惰性对象（比如 gettext_lazy() 的返回值），否则会一直是第一次访问时的结果。
 
     @property
-    def names(cls) -> list[str]:
+    def names(cls) -> tuple[str, ...]:
         """
         所有枚举成员的名称（定义枚举成员时的全大写变量名）。
         """
-        empty = ["__empty__"] if hasattr(cls, "__empty__") else []
-        return empty + [member.name for member in cls]
+        return cls._names_
 
     @property
-    def values(cls) -> list:
+    def values(cls) -> tuple:
         """
         所有枚举成员的值（定义枚举成员时等号右边元组的第一个值）。
         """
-        empty = [None] if hasattr(cls, "__empty__") else []
-        return empty + [member.value for member in cls]
+        return cls._values_
 
     @property
-    def items(cls) -> dict[str, Any]:
+    def items(cls) -> Mapping[str, Any]:
         """
         所有枚举成员的名称和值。
         """
-        its = {"__empty__": None} if hasattr(cls, "__empty__") else {}
-        its.update((member.name, member.value) for member in cls)
-        return its
+        return cls._items_
 
     @property
-    def choices(cls) -> list[tuple[str, Any] | tuple[None, Any]]:
+    def choices(cls) -> tuple[tuple[str, Any] | tuple[None, Any], ...]:
         """
         所有枚举成员的值，和所有枚举成员的属性中的标签（label）。
         """
-        if 'label' not in cls.__properties__:
+        if 'label' not in cls._properties_:
             raise AttributeError(
                 '使用 .choices 属性前必须在 __properties__ 中'
                 '添加一个名为 "label" 的属性，且必须保证枚举值中有相应的属性值。'
             )
-        empty = [(None, cls.__empty__)] if hasattr(cls, "__empty__") else []
-        return empty + [(member.value, member.label) for member in cls]
+        if cls._choices_ is None:
+            empty = ((None, cls.__empty__),) if hasattr(cls, '__empty__') else ()
+            cls._choices_ = empty + tuple(zip(cls._column('value'), cls._column('label')))
+        return cls._choices_
 
     def asdict(cls) -> dict[enum.Enum, Any]:
         """
@@ -165,19 +262,19 @@ class Items(enum.Enum, metaclass=ItemsMeta):
     Senior
 
     >>> Grade.names
-    ['FRESHMAN', 'SOPHOMORE', ...]
+    ('FRESHMAN', 'SOPHOMORE', ...)
 
     >>> Grade.values
-    [1, 2, 3, 4, 5]
+    (1, 2, 3, 4, 5)
 
     >>> Grade.codes
-    ['FR', 'SO', 'JR', 'SR', 'GR']
+    ('FR', 'SO', 'JR', 'SR', 'GR')
 
     >>> Grade.colors
-    [14897940, 15537588, ...]
+    (14897940, 15537588, ...)
 
     >>> Grade.labels
-    ['Freshman', 'Sophomore', ...]
+    ('Freshman', 'Sophomore', ...)
     """
 
     __properties__ = ()